@@ -0,0 +1,161 @@
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# times the parser, the reduction, the graph conversion, the plotting and the suite discovery on synthetic suites
+# and stores the results as json, so that changes can be compared on the same data
+# usage: python3 bench/hotpaths.py [--lines N] [--output results.json]
+#        python3 bench/hotpaths.py --compare before.json after.json
+
+_repository_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, _repository_path)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from loggen import write_suite, write_tree
+
+import src.utils
+from src.extract import extract_benchmarks, extract_run_log, restrict_benchmarks
+from src.utils import BenchmarkIterator, SuiteIndex
+
+
+def _time(function, repeats: int, prepare=lambda: None) -> dict[str, float]:
+    durations = []
+
+    for _ in range(repeats):
+        argument = prepare()
+
+        start = time.perf_counter()
+        function(argument)
+        durations.append(time.perf_counter() - start)
+
+    return {"median": statistics.median(durations), "min": min(durations), "max": max(durations)}
+
+
+def _git_commit() -> str | None:
+    result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=_repository_path, capture_output=True, text=True)
+
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+# a fresh index without a file, so every directory is listed again
+def _reset_suite_index(index_path: str) -> None:
+    src.utils._suite_index = SuiteIndex(index_path)
+
+
+def _plot_graphs(graphs, output_path: str) -> None:
+    from src.plot import Plot
+
+    Plot(graphs, "hotpaths", "r_l2").save_and_close(output_path)
+
+
+def run_benchmarks(args, workdir: str) -> dict:
+    suite = os.path.join(workdir, "suite")
+    tree = os.path.join(workdir, "tree")
+    index_path = os.path.join(workdir, "index.json")
+
+    write_suite(suite, args.lines, args.inner, args.repetitions, args.seed)
+    suite_amount = write_tree(tree, args.depth, args.fanout)
+    log_path = os.path.join(suite, "run0.log")
+
+    _reset_suite_index(index_path)
+
+    results = {}
+
+    def record(name: str, function, prepare=lambda: None) -> None:
+        results[name] = _time(function, args.repeats, prepare)
+        print(f"{name:<22} {results[name]['median'] * 1000:10.1f} ms")
+
+    record("extract_run_log", lambda _: extract_run_log(log_path))
+    record("extract_benchmarks", lambda _: extract_benchmarks(suite))
+
+    extracted = extract_benchmarks(suite)
+    record("restrict_benchmarks", lambda b: restrict_benchmarks(b, ["NG_mg", "NG_inner_mg_0"], ["r_l2"]),
+           lambda: copy.deepcopy(extracted))
+    record("to_graphs", lambda b: [g for benchmark in b for g in benchmark.to_graphs()], lambda: copy.deepcopy(extracted))
+
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+
+        graphs = [g for b in restrict_benchmarks(copy.deepcopy(extracted), ["NG_mg", "NG_inner_mg_0"], ["r_l2"])
+                  for g in b.to_graphs()]
+        record("plot", lambda _: _plot_graphs(graphs, os.path.join(workdir, "plot.pdf")))
+    except ImportError as e:
+        print(f"skipping plot: {e}")
+        results["plot"] = {"skipped": str(e)}
+
+    record("iterator_cold", lambda _: sum(1 for _ in BenchmarkIterator(tree)), lambda: _reset_suite_index(index_path))
+    record("iterator_warm", lambda _: sum(1 for _ in BenchmarkIterator(tree)))
+
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "parameters": {"lines": args.lines, "inner": args.inner, "repetitions": args.repetitions, "seed": args.seed,
+                       "suites": suite_amount, "depth": args.depth, "fanout": args.fanout, "repeats": args.repeats},
+        "results": results,
+    }
+
+
+def compare(before_path: str, after_path: str) -> int:
+    with open(before_path, 'r') as f:
+        before = json.load(f)
+    with open(after_path, 'r') as f:
+        after = json.load(f)
+
+    if before["parameters"] != after["parameters"]:
+        print("the results were measured with different parameters, the comparison is meaningless")
+
+    print(f"{'benchmark':<22} {'before':>10} {'after':>10} {'speedup':>8}")
+    for name, result in after["results"].items():
+        if name not in before["results"] or "median" not in result or "median" not in before["results"][name]:
+            continue
+
+        old = before["results"][name]["median"]
+        new = result["median"]
+        print(f"{name:<22} {old * 1000:8.1f}ms {new * 1000:8.1f}ms {old / new:7.2f}x")
+
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog='hotpaths')
+    parser.add_argument("--lines", type=int, default=100_000, help="approximate lines per run log, e.g. 1000000")
+    parser.add_argument("--inner", type=int, default=50, help="amount of inner benchmarks per run log")
+    parser.add_argument("--repetitions", type=int, default=3, help="run logs of the suite")
+    parser.add_argument("--depth", type=int, default=4, help="depth of the suite tree for the discovery")
+    parser.add_argument("--fanout", type=int, default=6, help="subdirectories per level of the suite tree")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3, help="how often every benchmark is timed")
+    parser.add_argument("--output", type=str, help="json file to store the results in")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        return compare(*args.compare)
+
+    # the suite index is written relative to the working directory
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            results = run_benchmarks(args, workdir)
+        finally:
+            os.chdir(cwd)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import argparse
+import os
+import random
+import sys
+
+# writes synthetic suites whose run logs look like the ones of the nlDiffusion app:
+# an outer benchmark NG_mg and one inner benchmark NG_inner_mg_<i> per outer iteration, interleaved with other log lines
+# usage: python3 bench/loggen.py <dir> [--lines N] [--inner N] [--repetitions N] [--seed N]
+
+_prm_template = """BenchmarkMetaData
+{{
+\tbinary /nonexistent/nlDiffusionExample;
+\ttasks 1;
+\trepeat {repetitions};
+\treduce avg;
+}}
+
+FritzMetaParameters
+{{
+\tfrequency 2000000;
+\tpinThreads true;
+}}
+
+Parameters
+{{
+\tmaxLevel 5;
+\tmeshX 4;
+\tmeshY 4;
+\tmeshZ 4;
+}}
+"""
+
+_line_prefix = "[0][INFO    ]------({seconds:.3f} sec) "
+
+
+def write_run_log(path: str, lines: int, inner_benchmarks: int, seed: int) -> None:
+    rng = random.Random(seed)
+    # one outer measurement and a tenth of unrelated lines per inner solve
+    inner_iterations = max(1, lines // inner_benchmarks * 10 // 11 - 1)
+    seconds = 0.0
+
+    def prefix() -> str:
+        return _line_prefix.format(seconds=seconds)
+
+    with open(path, 'w') as f:
+        f.write(prefix() + "#benchmark[NG_mg]: r_l2, time, acc_iterations<int>\n")
+        for o in range(inner_benchmarks):
+            f.write(prefix() + f"#benchmark[NG_inner_mg_{o}]: r_l2, time\n")
+
+        r_outer = 1.0
+        accumulated_iterations = 0
+        for o in range(inner_benchmarks):
+            r_inner = 1.0
+            outer_seconds = 0.0
+            spread = inner_iterations // 20
+            iterations = max(1, inner_iterations + rng.randint(-spread, spread))
+
+            for i in range(iterations):
+                step = rng.uniform(0.001, 0.002)
+                seconds += step
+                outer_seconds += step
+                # stays representable as a float, like residuals that stagnate at machine precision
+                r_inner = max(r_inner * rng.uniform(0.05, 0.2), 1e-16)
+                f.write(prefix() + f"@[NG_inner_mg_{o}]:{i} r_l2 = {r_inner:.6e}, time = {step:.6e}\n")
+
+                if i % 10 == 0:
+                    f.write(prefix() + f"smoothing level {i % 6}, coarse grid residual {r_inner * 10:.3e}\n")
+
+            accumulated_iterations += iterations
+            r_outer *= rng.uniform(0.1, 0.5)
+            # like fake_hyteg.py, the time of this outer iteration and the inner iterations of all outer iterations so far
+            f.write(prefix() + f"@[NG_mg]:{o} r_l2 = {r_outer:.6e}, time = {outer_seconds:.6e}, "
+                               f"acc_iterations = {accumulated_iterations}\n")
+
+        f.write("#run-complete\n")
+
+
+def write_suite(directory: str, lines: int, inner_benchmarks: int, repetitions: int, seed: int) -> None:
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "Parameters.prm"), 'w') as f:
+        f.write(_prm_template.format(repetitions=repetitions))
+
+    for i in range(repetitions):
+        write_run_log(os.path.join(directory, f"run{i}.log"), lines, inner_benchmarks, seed + i)
+
+
+# fanout ** depth suites that only contain a parameter file, for timing the suite discovery
+def write_tree(root: str, depth: int, fanout: int) -> int:
+    if depth == 0:
+        os.makedirs(root, exist_ok=True)
+        with open(os.path.join(root, "Parameters.prm"), 'w') as f:
+            f.write(_prm_template.format(repetitions=1))
+        return 1
+
+    return sum(map(lambda i: write_tree(os.path.join(root, f"level{depth}_{i}"), depth - 1, fanout), range(fanout)))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog='loggen')
+    parser.add_argument("dir", help="suite directory to write")
+    parser.add_argument("--lines", type=int, default=1_000_000, help="approximate lines per run log")
+    parser.add_argument("--inner", type=int, default=50, help="amount of inner benchmarks, i.e. outer iterations")
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_suite(args.dir, args.lines, args.inner, args.repetitions, args.seed)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# measures how long the cli takes for commands that never plot, they must not import matplotlib
+# usage: python3 bench/startup.py [--repetitions N] [--budget SECONDS]
+
+_repository_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _time_command_raw(command: list[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(command)
+
+    return time.perf_counter() - start
+
+
+def _time_command(arguments: list[str], env: dict[str, str], cwd: str) -> float:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.join(_repository_path, "main.py")] + arguments, env=env, cwd=cwd,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    duration = time.perf_counter() - start
+
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(arguments)} failed: {result.stderr.decode('utf-8')}")
+
+    return duration
+
+
+def _imported_modules(arguments: list[str], env: dict[str, str], cwd: str) -> set[str]:
+    result = subprocess.run([sys.executable, "-X", "importtime", os.path.join(_repository_path, "main.py")] + arguments,
+                            env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    # lines look like: import time:       123 |        456 |   package.module
+    lines = result.stderr.decode("utf-8").splitlines()
+    return set(line.split('|')[-1].strip() for line in lines if line.startswith("import time:"))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog='startup')
+    parser.add_argument("--repetitions", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=0.1, help="maximal median duration of a command in seconds")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("BA_BENCHMARKING_UTILITIES_ENV", "laptop")
+    # installed code starts from cached bytecode, without it every run compiles the modules again
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    with tempfile.TemporaryDirectory() as cwd:
+        commands = {
+            "meshgen": ["meshgen", "1200", "1"],
+            "config": ["config", os.path.join(cwd, "suite"), "--create"],
+            "sweep": ["sweep", os.path.join(cwd, "sweep"), "--axis", "chebyshevOrder=1,2,3", "--dry-run"],
+        }
+
+        baseline = statistics.median(
+            [_time_command_raw([sys.executable, "-c", "pass"]) for _ in range(args.repetitions)])
+        print(f"{'interpreter':<12} {baseline * 1000:8.1f} ms")
+
+        exceeded = False
+        for name, arguments in commands.items():
+            # the first run writes the bytecode caches
+            _time_command(arguments, env, cwd)
+
+            median = statistics.median([_time_command(arguments, env, cwd) for _ in range(args.repetitions)])
+            plotting = any(map(lambda m: m.split('.')[0] == "matplotlib", _imported_modules(arguments, env, cwd)))
+
+            print(f"{name:<12} {median * 1000:8.1f} ms{'  imports matplotlib' if plotting else ''}")
+            exceeded = exceeded or median > args.budget or plotting
+
+    if exceeded:
+        print(f"some commands exceed the budget of {args.budget * 1000:.0f} ms or import matplotlib")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
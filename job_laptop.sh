@@ -1,8 +1,36 @@
 #!/bin/bash -l
 
-if [ "$#" -ne 4 ]; then
-    echo "Illegal number of parameters. Needs bin, .prm file, output and mpi task amount."
+if [ "$#" -ne 4 ] && [ "$#" -ne 6 ]; then
+    echo "Illegal number of parameters. Needs bin, .prm file, output, mpi task amount and optionally core list and binding."
     exit 1
 fi
 
-mpirun -N "$4" "$1" "$2" >"$3"
\ No newline at end of file
+# restricts the ranks to the given cores, e.g. 0,8:1,9 for two cores with their SMT siblings, binding is core or none.
+# the cpus are ids of the operating system, open mpi's --cpu-set would read them as hwloc logical ids,
+# so the ranks are pinned with taskset instead. on a single machine -n is equivalent to -N
+launcher=()
+placement=(-N "$4")
+if [ "$#" -eq 6 ] && [ "$6" = "core" ]; then
+    placement=(--bind-to none -n "$4" "$(dirname "$0")/pin_rank.sh" "$5")
+elif [ "$#" -eq 6 ]; then
+    launcher=(taskset -c "${5//:/,}")
+    placement=(--bind-to none -n "$4")
+fi
+
+# the status and stderr of the run are kept next to its log
+status="${3%.log}.status"
+stderr="${3%.log}.stderr"
+
+"${launcher[@]}" mpirun "${placement[@]}" "$1" "$2" >"$3" 2>"$stderr"
+exit_code=$?
+
+{
+    echo "exit_code=$exit_code"
+    if [ "$exit_code" -gt 128 ]; then echo "signal=$((exit_code - 128))"; fi
+    echo "stderr_tail:"
+    tail -n 20 "$stderr"
+} >"$status"
+
+if [ "$exit_code" -eq 0 ]; then echo "#run-complete" >>"$3"; fi
+
+exit "$exit_code"
@@ -1,19 +1,13 @@
 import argparse
 import os
-from pathlib import PurePath
+from typing import TYPE_CHECKING
 
-from src.compare import compare_existing_logs
-from src.config import create_config, set_configs
-from src.meshgen import calculate_3d_mesh_config
-from src.run import run
-from src.plot import std_plot
-from src.move import move_benchmark_folders
+from src.meshgen import calculate_3d_mesh_config, calculate_3d_mesh_series, parse_task_counts, \
+    format_mesh_series_sweep_axes
 
-import logging
-
-from src.utils import BenchmarkIterator, load_prm_file, build_run_log_filename
-
-_logger = logging.getLogger(__name__)
+# the runner is only imported by the commands that run
+if TYPE_CHECKING:
+    from src.run import RunOptions
 
 
 def main():
@@ -45,11 +39,58 @@ def main():
                                help="sets missing values to their default")
     config_parser.add_argument("--assignments", nargs='*',
                                help="<Block>.<field>=<value>, for non-default updates")
+    config_parser.add_argument("--diff", action='store_true',
+                               help="only print how the configs would change instead of writing them")
+    config_parser.add_argument("--jobs", type=int,
+                               help="amount of processes rendering the configs of large trees, defaults to the core count")
+
+    sweep_parser = subparsers.add_parser('sweep')
+    sweep_parser.add_argument("root", help="directory the suites of the sweep are created in", type=str)
+    sweep_parser.add_argument("--axis", action='append', required=True,
+                              help="<Block>.<field>=<value>,<value>,..., one directory level per axis")
+    sweep_parser.add_argument("--zip", action='store_true',
+                              help="combine the n-th values of all axes instead of every combination")
+    sweep_parser.add_argument("--assignments", nargs='*',
+                              help="<Block>.<field>=<value>, for non-default updates shared by all suites")
+    sweep_parser.add_argument("--dry-run", action='store_true', help="only print the suites that would be created")
+
+    table_parser = subparsers.add_parser('table')
+    table_parser.add_argument("dirs", help="which benchmark directories to summarize", nargs='+')
+    table_parser.add_argument("--columns", required=True, type=str,
+                              help="<benchmark>.<metric>:<aggregation>,..., aggregations are last, first, min, max, "
+                                   "sum, mean, iterations and to_tolerance=<tolerance>")
+    table_parser.add_argument("--parameters", type=str,
+                              help="<field>,<Block>.<field>,..., defaults to the parameters that differ between suites")
+    table_parser.add_argument("--format", choices=["csv", "md", "latex"], default="csv")
+    table_parser.add_argument("--sort", type=str, help="column to sort the suites by")
+    table_parser.add_argument("--descending", action='store_true')
+    table_parser.add_argument("--jobs", type=int,
+                              help="amount of processes extracting the logs of large trees, defaults to the core count")
+    table_parser.add_argument("--output", type=str, help="file to write the table to instead of printing it")
+    table_parser.add_argument("--scaling", action='store_true',
+                              help="one row per suite of every scaling study with the speedup and the efficiency of "
+                                   "the first column, e.g. NG_mg.time:sum")
+
+    scaling_parser = subparsers.add_parser('scaling-study')
+    scaling_parser.add_argument("root", help="directory the suites of the study are created in", type=str)
+    scaling_parser.add_argument("--tasks", required=True, type=str,
+                                help="<tasks>,<tasks>,... or <first>-<last>, which doubles the task count")
+    scaling_parser.add_argument("--tets-per-thread", required=True, type=int,
+                                help="tets per task, for strong scaling the ones of the smallest task count")
+    scaling_parser.add_argument("--mode", choices=["weak", "strong"], default="weak")
+    scaling_parser.add_argument("--tets-per-block", help="number of tets per block", type=int, default=6)
+    scaling_parser.add_argument("--name", type=str, help="name of the study, defaults to the name of root")
+    scaling_parser.add_argument("--assignments", nargs='*',
+                                help="<Block>.<field>=<value>, for non-default updates shared by all suites")
+    scaling_parser.add_argument("--dry-run", action='store_true', help="only print the suites that would be created")
 
     meshgen_parser = subparsers.add_parser('meshgen')
-    meshgen_parser.add_argument("total_tets", help="total number of tets", type=int)
+    meshgen_parser.add_argument("total_tets", help="total number of tets, omitted with --series", type=int, nargs='?')
     meshgen_parser.add_argument("tets_per_thread", help="number of tets per thread", type=int, default=1)
     meshgen_parser.add_argument("--tets-per-block", help="number of tets per block", type=int, default=6)
+    meshgen_parser.add_argument("--series", type=str,
+                                help="<tasks>,<tasks>,..., prints the configs of a weak scaling series with "
+                                     "tets_per_thread tets per task and the matching sweep axes")
 
     move_parser = subparsers.add_parser("move")
     move_parser.add_argument("from_loc", help="old benchmark file location")
@@ -62,21 +103,14 @@ def main():
     # _logger.info(args)
 
     if args.command == 'run':
-        target_dirs = list(map(os.path.abspath, args.dirs))
-        multicore = bool(args.m)
-
-        run(target_dirs, multicore)
-
+        exec_run_command(args)
 
     elif args.command == 'plot':
         exec_plot_command(args)
 
     elif args.command == 'benchmark':
-        target_dirs = list(map(os.path.abspath, args.dirs))
-        multicore = bool(args.m)
-        run(target_dirs, multicore)
-
-        exec_plot_command(args)
+        if exec_run_command(args):
+            exec_plot_command(args)
 
     elif args.command == 'compare':
         target_dirs = map(lambda f: os.path.abspath(f), args.dirs)
@@ -107,10 +141,17 @@ def main():
         if args.plot_title is not None:
             plot_title = args.plot_title
 
+        assert args.kind is None or args.kind == 'std', "compare only supports --kind std"
+
+        # matplotlib takes long to import, so only commands that plot import it
+        from src.compare import compare_existing_logs
+
         compare_existing_logs(list(target_dirs), wanted_benchmarks, wanted_metrics, show, format, x_axis, y_axis,
                               x_axis_label, y_axis_label, plot_title)
 
     elif args.command == 'config':
+        from src.config import create_config, set_configs
+
         name = args.suite_name
         create = bool(args.create)
         set_defaults = bool(args.set_defaults)
@@ -123,16 +164,98 @@ def main():
         if create:
             create_config(name, assignments)
         else:
-            set_configs(name, assignments, set_defaults, add_missing_defaults)
+            if args.jobs is not None:
+                assert args.jobs > 0, "--jobs must be positive"
+
+            set_configs(name, assignments, set_defaults, add_missing_defaults, bool(args.diff), args.jobs)
+
+    elif args.command == 'sweep':
+        from src.config import create_sweep, parse_sweep_axis
+
+        axes = list(map(parse_sweep_axis, args.axis))
+        assignments = []
+
+        if args.assignments is not None:
+            assignments = args.assignments
+
+        suite_paths = create_sweep(args.root, axes, bool(args.zip), assignments, bool(args.dry_run))
+
+        if args.dry_run:
+            for p in suite_paths:
+                print(p)
+            print(f"{len(suite_paths)} suites would be created")
+        else:
+            print(f"created {len(suite_paths)} suites")
+
+    elif args.command == 'table':
+        from src.table import create_table, create_scaling_table, parse_summary_column
+
+        columns = list(map(parse_summary_column, args.columns.split(',')))
+
+        parameters = None
+        if args.parameters is not None:
+            parameters = args.parameters.split(',')
+
+        if args.jobs is not None:
+            assert args.jobs > 0, "--jobs must be positive"
+
+        if args.scaling:
+            assert args.parameters is None and args.sort is None, \
+                "scaling tables are ordered by study and tasks and have no parameter columns"
+
+            table = create_scaling_table(list(map(os.path.abspath, args.dirs)), columns, args.format, args.jobs)
+        else:
+            table = create_table(list(map(os.path.abspath, args.dirs)), columns, parameters, args.format, args.sort,
+                                 bool(args.descending), args.jobs)
+
+        if args.output is None:
+            print(table, end='')
+        else:
+            with open(args.output, 'w') as f:
+                f.write(table)
+
+    elif args.command == 'scaling-study':
+        from src.config import create_scaling_study
+
+        name = args.name
+        if name is None:
+            name = os.path.basename(os.path.normpath(os.path.abspath(args.root)))
+
+        assignments = []
+        if args.assignments is not None:
+            assignments = args.assignments
+
+        suites = create_scaling_study(args.root, name, parse_task_counts(args.tasks), int(args.tets_per_thread),
+                                      args.mode, int(args.tets_per_block), assignments, bool(args.dry_run))
+
+        for path, tasks, config in suites:
+            print(f"{path} {tasks} {config}")
+
+        if args.dry_run:
+            print(f"{len(suites)} suites would be created")
+        else:
+            print(f"created {len(suites)} suites of the {args.mode} scaling study {name}")
 
     elif args.command == 'meshgen':
-        total_tets = int(args.total_tets)
         tets_per_thread = int(args.tets_per_thread)
         tets_per_block = int(args.tets_per_block)
 
-        config = calculate_3d_mesh_config(total_tets * tets_per_thread, tets_per_block)
-        print(config)
+        if args.series is not None:
+            assert args.total_tets is None, "total_tets and --series are mutually exclusive"
+
+            series = calculate_3d_mesh_series(parse_task_counts(args.series), tets_per_thread, tets_per_block)
+            for tasks, config in series:
+                print(f"{tasks} {config}")
+            print(format_mesh_series_sweep_axes(series))
+        else:
+            assert args.total_tets is not None, "total_tets is required without --series"
+
+            config = calculate_3d_mesh_config(int(args.total_tets) * tets_per_thread, tets_per_block)
+            print(config)
     elif args.command == 'move':
+        from pathlib import PurePath
+        from src.move import move_benchmark_folders
+
         from_loc = os.path.abspath(args.from_loc)
         to = os.path.abspath(args.to)
 
@@ -147,6 +270,56 @@ def main():
 def add_run_args(parser):
     parser.add_argument("dirs", help="which benchmark directories to run", nargs='+')
     parser.add_argument("-m", help="allow running jobs on multiple cores", action="store_true", default=False)
+    parser.add_argument("--make-jobs", help="amount of parallel make jobs per binary folder, defaults to the core count",
+                        type=int)
+    parser.add_argument("--resume", action="store_true",
+                        help="keep complete run logs and only run missing or truncated repetitions")
+    parser.add_argument("--no-reuse", action="store_true",
+                        help="always run, even if the result store contains runs of an identical suite")
+    parser.add_argument("--wait", action="store_true",
+                        help="keep running until submitted slurm jobs finished, e.g. for adaptive repetitions")
+    parser.add_argument("--failed-only", action="store_true",
+                        help="only rerun repetitions whose recorded status is a failure, keeps all other run logs")
+    parser.add_argument("--stall-timeout", type=float,
+                        help="kill runs that print no new measurement for this many seconds")
+    parser.add_argument("--stall-factor", type=float,
+                        help="kill runs that take this many times longer than the slowest recorded identical run")
+    parser.add_argument("--retries", type=int, default=0, help="how often killed runs are restarted")
+    parser.add_argument("--plan", action="store_true",
+                        help="only print the jobs with their predicted runtimes, node-hours and makespan")
+
+
+# the runner pulls in the backends and the result store, so commands that don't run import it lazily
+# returns False if only the plan was printed
+def exec_run_command(args) -> bool:
+    from src.plan import plan
+    from src.run import run
+
+    target_dirs = list(map(os.path.abspath, args.dirs))
+
+    if args.plan:
+        plan(target_dirs, build_run_options(args))
+        return False
+
+    run(target_dirs, build_run_options(args))
+    return True
+
+
+def build_run_options(args) -> 'RunOptions':
+    from src.run import RunOptions
+    from src.watchdog import StallPolicy
+
+    options = RunOptions(multicore=bool(args.m), resume=bool(args.resume), reuse=not bool(args.no_reuse),
+                         wait=bool(args.wait), failed_only=bool(args.failed_only))
+
+    if args.make_jobs is not None:
+        assert args.make_jobs > 0, "--make-jobs must be positive"
+        options.make_jobs = args.make_jobs
+
+    assert args.retries >= 0, "--retries must not be negative"
+    options.stall_policy = StallPolicy(args.stall_timeout, args.stall_factor, args.retries)
+
+    return options
 
 
 def add_common_plot_args(parser):
@@ -162,9 +335,15 @@ def add_common_plot_args(parser):
     parser.add_argument("--x-axis-label", type=str)
     parser.add_argument("--y-axis-label", type=str)
     parser.add_argument("--plot-title", type=str)
+    parser.add_argument("--kind", type=str,
+                        help="std | heatmap | inner-work, the latter two plot indexed benchmark families like "
+                             "NG_inner_mg_0..N as one (outer, inner) array, --benchmarks selects families by prefix")
 
 
 def exec_plot_command(args):
+    import logging
+    from src.plot import std_plot, family_plot
+
     format = 'std'
     if args.format is not None:
         assert args.format in ['std', 'script']
@@ -176,8 +355,21 @@ def exec_plot_command(args):
         wanted_metrics = args.metrics.split(',')
     show = bool(args.show)
 
+    if args.kind is not None and args.kind != 'std':
+        # family plots are already written one per family, --benchmarks selects them
+        if args.for_each is not None:
+            logging.getLogger(__name__).error(f"--for-each doesn't work with --kind {args.kind}, use --benchmarks")
+            exit(1)
+
+        wanted_families = None
+        if args.benchmarks is not None:
+            wanted_families = args.benchmarks.split(',')
+
+        family_plot(target_dir, args.kind, wanted_families, wanted_metrics, format)
+        return
+
     if args.for_each is not None and args.benchmarks is not None:
-        _logger.error("exactly one of --for-each or --benchmarks should be specified")
+        logging.getLogger(__name__).error("exactly one of --for-each or --benchmarks should be specified")
         exit(1)
 
     if args.for_each is None and args.benchmarks is None:
@@ -0,0 +1,33 @@
+#!/bin/bash
+
+if [ "$#" -lt 5 ]; then
+    echo "Illegal number of parameters. Needs cpu list, pinning (true or false), comma separated likwid groups, output and the command."
+    exit 1
+fi
+
+# wraps every rank of an srun step that measures hardware performance counters.
+# only the first rank of every node runs likwid-perfctr, it measures the cores of all ranks of the step on its node,
+# so every hardware thread and the uncore counters of every socket are read once. the other ranks are only pinned
+cpu_list="$1"
+pin="$2"
+groups="$3"
+output="$4"
+shift 4
+
+if [ "${SLURM_LOCALID:-0}" -eq 0 ]; then
+    group_options=()
+    for group in ${groups//,/ }; do
+        group_options+=(-g "$group")
+    done
+
+    cpu_option=-c
+    if [ "$pin" = "true" ]; then cpu_option=-C; fi
+
+    exec likwid-perfctr "$cpu_option" "$cpu_list" "${group_options[@]}" -O -o "$output" "$@"
+fi
+
+if [ "$pin" = "true" ]; then
+    exec likwid-pin -q -C "$cpu_list" "$@"
+fi
+
+exec "$@"
@@ -0,0 +1,15 @@
+#!/bin/bash
+
+if [ "$#" -lt 2 ]; then
+    echo "Illegal number of parameters. Needs the cores of all ranks and the command."
+    exit 1
+fi
+
+# pins the calling mpi rank to its core, the cores are given as cpu ids of the operating system separated by colons,
+# e.g. 0,8:1,9 pins rank 0 to the cpus 0 and 8 and rank 1 to the cpus 1 and 9
+cores=(${1//:/ })
+shift
+
+rank="${OMPI_COMM_WORLD_LOCAL_RANK:-${MPI_LOCALRANKID:-${PMI_RANK:-0}}}"
+
+exec taskset -c "${cores[$rank]}" "$@"
@@ -3,13 +3,23 @@ import operator
 from dataclasses import dataclass
 from functools import reduce
 
-from src.utils import Point2D, Graph
-
 import logging
 
 _logger = logging.getLogger(__name__)
 
 
+@dataclass
+class Point2D:
+    x: float
+    y: float
+
+
+@dataclass
+class Graph:
+    label: str
+    points: list[Point2D]
+
+
 class MetricDeclaration:
     name: str
     type: str
@@ -91,12 +101,16 @@ class Benchmark:
         if len(self.measurements) == 0:
             return []
 
-        def get_x_value(m: MetricsMeasurement) -> float:
+        def get_x_value(m: MetricsMeasurement) -> float | None:
             if x_axis == "iterations":
                 return m.iteration
 
             candidates = list(filter(lambda measurement: measurement[0] == x_axis, m.values))
-            assert len(candidates) == 1, "found duplicates in metric names: " + x_axis
+            assert len(candidates) <= 1, "found duplicates in metric names: " + x_axis
+
+            # derived metrics don't exist for every measurement, e.g. the convergence factor of the first iteration
+            if len(candidates) == 0:
+                return None
 
             return float(candidates[0][1])
 
@@ -110,19 +124,22 @@ class Benchmark:
         # for plotting we need a list for each metric containing the values
         # gets a list of measurements for each metric and adds the different measurements from m to the corresponding metric list
         def _fold_measurements(l: list[Graph], m: MetricsMeasurement) -> list[Graph]:
+            x = get_x_value(m)
+            if x is None:
+                return l
+
             for value in filter_y_values(m.values):
                 for graph in l:
                     if graph.label == value[0]:
-                        graph.points.append(Point2D(get_x_value(m), float(value[1])))
+                        graph.points.append(Point2D(x, float(value[1])))
                         break
+                else:
+                    # todo this could actually check the metric data type and cast value to int or float
+                    l.append(Graph(value[0], [Point2D(x, float(value[1]))]))
 
             return l
 
-        first_measurement = self.measurements[0]
-        # todo this could actually check the metric data type and cast value to int or float
-        graphs_start = [Graph(metric, [Point2D(get_x_value(first_measurement), float(value))]) for (metric, value) in
-                        filter_y_values(first_measurement.values)]
-        graphs = reduce(_fold_measurements, self.measurements[1:], graphs_start)
+        graphs = reduce(_fold_measurements, self.measurements, [])
 
         for g in graphs:
             g.label = f"{self.decl.name}." + g.label
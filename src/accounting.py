@@ -0,0 +1,75 @@
+import json
+import os
+import re
+from dataclasses import dataclass, asdict
+
+from src.Benchmark import Benchmark, BenchmarkDeclaration, MetricDeclaration, MetricsMeasurement
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# name of the benchmark that exposes the resource usage to plot and compare
+RESOURCES_BENCHMARK = "resources"
+
+
+@dataclass
+class ResourceUsage:
+    # in seconds
+    wall_time: float
+    user_time: float | None = None
+    system_time: float | None = None
+    # in kilobytes
+    max_rss: float | None = None
+
+
+def build_run_usage_filename(i: int) -> str:
+    return f"run{i}.usage.json"
+
+
+def write_run_usage(target_dir: str, i: int, usage: ResourceUsage) -> None:
+    with open(os.path.join(target_dir, build_run_usage_filename(i)), 'w') as f:
+        json.dump(asdict(usage), f)
+
+
+def read_run_usage(target_dir: str, i: int) -> ResourceUsage | None:
+    usage_path = os.path.join(target_dir, build_run_usage_filename(i))
+
+    if not os.path.isfile(usage_path):
+        return None
+
+    with open(usage_path, 'r') as f:
+        return ResourceUsage(**json.load(f))
+
+
+# the resource usage of a run as a benchmark with a single measurement, metrics that weren't recorded are left out
+def build_usage_benchmark(usage: ResourceUsage) -> Benchmark:
+    values = [(name, str(value)) for name, value in asdict(usage).items() if value is not None]
+
+    decl = BenchmarkDeclaration(RESOURCES_BENCHMARK, [MetricDeclaration(name, 'float') for name, _ in values])
+    benchmark = Benchmark(decl)
+    benchmark.add_measurement(MetricsMeasurement(RESOURCES_BENCHMARK, 0, values))
+
+    return benchmark
+
+
+# sacct durations look like [DD-[HH:]]MM:SS[.mmm]
+def parse_slurm_duration(text: str) -> float | None:
+    match = re.fullmatch(r"(?:(?:(\d+)-)?(\d+):)?(\d+):(\d+(?:\.\d+)?)", text.strip())
+    if match is None:
+        return None
+
+    days, hours, minutes, seconds = match.groups()
+
+    return ((int(days or 0) * 24 + int(hours or 0)) * 60 + int(minutes)) * 60 + float(seconds)
+
+
+# sacct memory sizes look like 1234K, returned in kilobytes
+def parse_slurm_memory(text: str) -> float | None:
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([KMGT]?)", text.strip())
+    if match is None:
+        return None
+
+    factors = {'': 1 / 1024, 'K': 1, 'M': 1024, 'G': 1024 ** 2, 'T': 1024 ** 3}
+
+    return float(match.group(1)) * factors[match.group(2)]
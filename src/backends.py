@@ -0,0 +1,739 @@
+import json
+import math
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from functools import reduce
+from subprocess import Popen
+
+from src.accounting import ResourceUsage, parse_slurm_duration, parse_slurm_memory
+from src.history import predict_run_duration
+from src.perfctr import build_perfctr_output_filename, build_perfctr_command
+from src.status import build_run_status_filename, build_run_stderr_filename
+from src.store import suite_fingerprint, build_stored_run_log_path
+from src.topology import read_physical_cores, format_core_list
+from src.utils import find_single_prm_file, build_run_log_filename, RUN_COMPLETE_MARKER, load_benchmark_parameters
+from src.watchdog import StallPolicy, build_watchdog_arguments, build_watchdog_command, get_watchdog_environment
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+_repository_path = os.path.join(os.path.dirname(__file__), '..')
+
+
+@dataclass
+class RunRequest:
+    target_dir: str
+    repetition: int
+    params: dict[str, dict[str, str]]
+    # suites with the same fingerprint that get the log of this run linked instead of running it themselves
+    duplicate_dirs: list[str] = field(default_factory=list)
+
+    def tasks(self) -> int:
+        return int(self.params["BenchmarkMetaData"]["tasks"])
+
+    def run_log_path(self) -> str:
+        return os.path.abspath(os.path.join(self.target_dir, build_run_log_filename(self.repetition)))
+
+
+@dataclass
+class JobPlan:
+    nodes: int
+    tasks: int
+    # share of the backend's capacity the job occupies while it runs
+    allocation: int
+    # in seconds, None if a run of the job has no recorded runtime
+    predicted_duration: float | None
+
+
+class BenchmarkJob:
+    tasks: int
+    name: str
+    runs: list[RunRequest]
+
+
+class LaptopJob(BenchmarkJob):
+    _subprocess: Popen
+    _start_time: float
+    _usage: ResourceUsage | None
+    # physical cores the job holds, None if the topology is unknown or the cores were released
+    _cores: list[list[int]] | None
+
+    def __init__(self, name: str, tasks: int, runs: list[RunRequest], subprocess: Popen,
+                 cores: list[list[int]] | None):
+        self.name = name
+        self.tasks = tasks
+        self.runs = runs
+        self._subprocess = subprocess
+        self._start_time = time.monotonic()
+        self._usage = None
+        self._cores = cores
+
+
+class FritzJob(BenchmarkJob):
+    job_id: str
+
+    def __init__(self, name: str, tasks: int, runs: list[RunRequest], job_id: str):
+        self.name = name
+        self.tasks = tasks
+        self.runs = runs
+        self.job_id = job_id
+
+
+class ExecutionBackend(ABC):
+    # whether runs of several suites are bundled into the same job, which needs all runs to be known beforehand
+    groups_across_suites: bool = False
+    # whether the jobs die with the runner, otherwise the runner may exit right after submitting
+    waits_for_jobs: bool = True
+    max_poll_interval: float = 1
+    # runs without progress get killed and retried by the watchdog
+    stall_policy: StallPolicy = StallPolicy()
+
+    # bundles runs into the jobs that get submitted
+    def group(self, runs: list[RunRequest]) -> list[list[RunRequest]]:
+        return list(map(lambda r: [r], runs))
+
+    def has_capacity(self, active_jobs: list[BenchmarkJob], runs: list[RunRequest]) -> bool:
+        return True
+
+    @abstractmethod
+    def submit(self, runs: list[RunRequest]) -> BenchmarkJob:
+        pass
+
+    # returns the jobs that finished
+    @abstractmethod
+    def poll_many(self, jobs: list[BenchmarkJob]) -> list[BenchmarkJob]:
+        pass
+
+    @abstractmethod
+    def cancel(self, job: BenchmarkJob) -> None:
+        pass
+
+    # how many allocation units of JobPlan concurrently running jobs may occupy together
+    def capacity(self) -> int:
+        return 1
+
+    # the resources a job would occupy, without submitting it, its runs are executed one after another
+    def plan_job(self, runs: list[RunRequest]) -> JobPlan:
+        tasks = max(map(lambda r: r.tasks(), runs))
+
+        return JobPlan(1, tasks, 1, _predict_waves_duration(runs, list(map(lambda i: [i], range(len(runs))))))
+
+    # resource usage of the runs of a finished job, keyed by the index into job.runs
+    def accounting(self, job: BenchmarkJob) -> dict[int, ResourceUsage]:
+        return {}
+
+    # stores jobs that outlive the runner, so a later runner can still process them after they finished
+    def detach_jobs(self, jobs: list[BenchmarkJob]) -> None:
+        return None
+
+    def restore_detached_jobs(self) -> list[BenchmarkJob]:
+        return []
+
+
+_backends: dict[str, type[ExecutionBackend]] = {}
+
+
+def register_backend(name: str):
+    def register(backend_class: type[ExecutionBackend]) -> type[ExecutionBackend]:
+        _backends[name] = backend_class
+        return backend_class
+
+    return register
+
+
+def create_backend(name: str, multicore: bool) -> ExecutionBackend:
+    if name not in _backends:
+        raise ValueError(f"invalid BA_BENCHMARKING_UTILITIES_ENV value {name}, "
+                         f"known backends are {', '.join(_backends.keys())}")
+
+    return _backends[name](multicore)
+
+
+@register_backend("laptop")
+class LaptopBackend(ExecutionBackend):
+    _core_budget: int | None
+    # physical cores that no running job is pinned to, empty if the topology is unknown
+    _free_cores: list[list[int]]
+    _pinning_enabled: bool
+
+    def __init__(self, multicore: bool):
+        self._free_cores = read_physical_cores()
+        self._pinning_enabled = len(self._free_cores) > 0
+
+        # without multicore only a single job runs at a time
+        # concurrent jobs get disjoint physical cores, SMT siblings would distort the timings
+        if not multicore:
+            self._core_budget = None
+        elif self._pinning_enabled:
+            self._core_budget = len(self._free_cores)
+        else:
+            self._core_budget = os.cpu_count()
+
+    def has_capacity(self, active_jobs: list[BenchmarkJob], runs: list[RunRequest]) -> bool:
+        if len(active_jobs) == 0:
+            return True
+
+        if self._core_budget is None:
+            return False
+
+        needed_tasks = sum(map(lambda r: r.tasks(), runs))
+
+        if self._pinning_enabled:
+            return needed_tasks <= len(self._free_cores)
+
+        active_tasks = sum(map(lambda j: j.tasks, active_jobs))
+
+        return active_tasks + needed_tasks <= self._core_budget
+
+    def capacity(self) -> int:
+        return 1 if self._core_budget is None else self._core_budget
+
+    def plan_job(self, runs: list[RunRequest]) -> JobPlan:
+        plan = super().plan_job(runs)
+
+        # multicore jobs share the cores, otherwise jobs run one after another
+        if self._core_budget is not None:
+            plan.allocation = plan.tasks
+
+        return plan
+
+    def submit(self, runs: list[RunRequest]) -> BenchmarkJob:
+        assert len(runs) == 1, "laptop jobs consist of a single run"
+        run = runs[0]
+
+        param_file_path = find_single_prm_file(run.target_dir)
+        binary_path = run.params["BenchmarkMetaData"]["binary"]
+        output_filepath = run.run_log_path()
+        jobscript_filepath = os.path.join(_repository_path, "job_laptop.sh")
+
+        command = [jobscript_filepath, binary_path, param_file_path, output_filepath, str(run.tasks())]
+
+        cores = None
+        if self._pinning_enabled:
+            # jobs with more tasks than free physical cores only start when nothing else runs,
+            # they run unpinned and hold all cores, so no other job starts next to them
+            oversized = run.tasks() > len(self._free_cores)
+            held_cores = len(self._free_cores) if oversized else run.tasks()
+
+            cores = self._free_cores[:held_cores]
+            self._free_cores = self._free_cores[held_cores:]
+
+            if not oversized:
+                # like pinThreads on fritz, without it the ranks may still move between the cores of the job
+                pin_threads = run.params.get("FritzMetaParameters", {}).get("pinThreads", "true") == "true"
+                command += [format_core_list(cores), "core" if pin_threads else "none"]
+
+        # the job gets its own process group, so cancelling it also stops mpirun and the ranks
+        if self.stall_policy.is_enabled():
+            watchdog_arguments = build_watchdog_arguments(self.stall_policy, run.target_dir, run.repetition,
+                                                          run.params)
+            job = Popen([sys.executable] + watchdog_arguments + command, env=get_watchdog_environment(),
+                        start_new_session=True)
+        else:
+            job = Popen(command, start_new_session=True)
+
+        return LaptopJob(output_filepath, run.tasks(), runs, job, cores)
+
+    def poll_many(self, jobs: list[BenchmarkJob]) -> list[BenchmarkJob]:
+        finished = []
+
+        for j in jobs:
+            assert isinstance(j, LaptopJob)
+
+            if j._usage is None:
+                # wait4 instead of Popen.poll, only it reports the resource usage of the reaped job script
+                pid, status, rusage = os.wait4(j._subprocess.pid, os.WNOHANG)
+                if pid == 0:
+                    continue
+
+                j._subprocess.returncode = os.waitstatus_to_exitcode(status)
+                # ru_maxrss is in kilobytes on linux
+                j._usage = ResourceUsage(time.monotonic() - j._start_time, rusage.ru_utime, rusage.ru_stime,
+                                         rusage.ru_maxrss)
+                self._release_cores(j)
+
+            finished.append(j)
+
+        return finished
+
+    def cancel(self, job: BenchmarkJob) -> None:
+        assert isinstance(job, LaptopJob)
+
+        if job._subprocess.poll() is None:
+            os.killpg(job._subprocess.pid, signal.SIGTERM)
+
+        self._release_cores(job)
+
+    def _release_cores(self, job: LaptopJob) -> None:
+        if job._cores is None:
+            return
+
+        # the lowest cores are handed out first, so the placement of a job doesn't depend on earlier jobs
+        self._free_cores = sorted(self._free_cores + job._cores)
+        job._cores = None
+
+    def accounting(self, job: BenchmarkJob) -> dict[int, ResourceUsage]:
+        assert isinstance(job, LaptopJob)
+
+        if job._usage is None:
+            return {}
+
+        return {0: job._usage}
+
+
+@register_backend("fritz")
+class SlurmBackend(ExecutionBackend):
+    groups_across_suites = True
+    waits_for_jobs = False
+    max_poll_interval = 600
+
+    cores_per_node = 72
+    max_node_amount = 32
+
+    # in seconds, the default is requested for chunks with runs that have no recorded runtime
+    default_time_limit = 6 * 3600
+    min_time_limit = 10 * 60
+    max_time_limit = 24 * 3600
+    time_limit_margin = 1.5
+
+    _chunk_counter: int
+
+    def __init__(self, multicore: bool):
+        self._chunk_counter = 0
+
+    # partition into chunks with same tasks amount
+    def group(self, runs: list[RunRequest]) -> list[list[RunRequest]]:
+        tasks_per_node = self.cores_per_node
+        chunks: dict[int, list[RunRequest]] = {}
+
+        for r in runs:
+            if r.tasks() not in chunks:
+                chunks[r.tasks()] = []
+
+            chunks[r.tasks()].append(r)
+
+        demanded_nodes = sum(map(lambda t: math.ceil(t / tasks_per_node), chunks.keys()))
+        free_nodes = self.max_node_amount - demanded_nodes
+
+        assert free_nodes > 0, "todo: implement load balancing on slurm machines"
+
+        if tasks_per_node in chunks:
+            single_node_chunks = chunks[tasks_per_node]
+            # spread single node chunks across remaining nodes
+            chunk_size = len(single_node_chunks) // (free_nodes + 1)
+            remainder = len(single_node_chunks) % (free_nodes + 1)
+            pointer = chunk_size
+
+            if remainder > 0:
+                pointer += 1
+            partition = [single_node_chunks[:pointer]]
+
+            for i in range(1, free_nodes):
+                old_pointer = pointer
+                pointer += chunk_size
+                if remainder > i:
+                    pointer += 1
+
+                partition.append(single_node_chunks[old_pointer:pointer])
+
+            partition.append(single_node_chunks[pointer:])
+
+            assert len(partition) == free_nodes + 1
+            assert sum(map(lambda c: len(c), partition)) == len(single_node_chunks)
+
+            del chunks[tasks_per_node]
+
+            total_chunks = list(chunks.values()) + partition
+        else:
+            total_chunks = list(chunks.values())
+
+        # empty partitions occur if there are less single node benchmarks than free nodes
+        return list(filter(lambda c: len(c) > 0, total_chunks))
+
+    def submit(self, runs: list[RunRequest]) -> BenchmarkJob:
+        chunk_index = self._chunk_counter
+        self._chunk_counter += 1
+
+        jobscript_filepath = self._write_jobscript(runs, chunk_index)
+        job_id = self._sbatch(jobscript_filepath)
+
+        benchmarks_str = reduce(lambda s, b: f"{s}, {b}", map(lambda r: r.target_dir, runs))
+        _logger.info(f"submitted chunk {chunk_index} as batch job {job_id}, consisting of benchmarks {benchmarks_str}")
+
+        return FritzJob(f"chunk{chunk_index}", runs[0].tasks(), runs, job_id)
+
+    def poll_many(self, jobs: list[BenchmarkJob]) -> list[BenchmarkJob]:
+        job_ids = list(map(lambda j: j.job_id, jobs))
+        finished_ids = self._finished_job_ids(job_ids)
+
+        return list(filter(lambda j: j.job_id in finished_ids, jobs))
+
+    def cancel(self, job: BenchmarkJob) -> None:
+        assert isinstance(job, FritzJob)
+        self._scancel(job.job_id)
+
+    def accounting(self, job: BenchmarkJob) -> dict[int, ResourceUsage]:
+        assert isinstance(job, FritzJob)
+
+        usage = {}
+        for step in self._sacct(job.job_id):
+            # steps are named after the index of their run inside the chunk
+            match = re.fullmatch(r"run(\d+)", step["JobName"])
+            if match is None or step.get("ElapsedRaw", '') == '':
+                continue
+
+            usage[int(match.group(1))] = ResourceUsage(float(step["ElapsedRaw"]),
+                                                       parse_slurm_duration(step.get("UserCPU", '')),
+                                                       parse_slurm_duration(step.get("SystemCPU", '')),
+                                                       parse_slurm_memory(step.get("MaxRSS", '')))
+
+        return usage
+
+    def detach_jobs(self, jobs: list[BenchmarkJob]) -> None:
+        detached = list(map(lambda j: {
+            "name": j.name,
+            "job_id": j.job_id,
+            "runs": list(map(lambda r: [r.target_dir, r.repetition, r.duplicate_dirs], j.runs)),
+        }, jobs))
+
+        with open(self._build_detached_jobs_filepath(), 'w') as f:
+            json.dump(detached, f)
+
+    def restore_detached_jobs(self) -> list[BenchmarkJob]:
+        detached_jobs_filepath = self._build_detached_jobs_filepath()
+        if not os.path.isfile(detached_jobs_filepath):
+            return []
+
+        with open(detached_jobs_filepath, 'r') as f:
+            detached = json.load(f)
+
+        os.unlink(detached_jobs_filepath)
+
+        jobs = []
+        for j in detached:
+            # suites that were deleted in the meantime can't be processed anymore
+            existing_runs = filter(lambda r: os.path.isdir(r[0]), j["runs"])
+            # runs detached by older runners have no duplicates
+            runs = list(map(lambda r: RunRequest(r[0], r[1], load_benchmark_parameters(r[0]),
+                                                 r[2] if len(r) > 2 else []), existing_runs))
+
+            if len(runs) > 0:
+                jobs.append(FritzJob(j["name"], runs[0].tasks(), runs, j["job_id"]))
+
+        return jobs
+
+    @staticmethod
+    def _build_detached_jobs_filepath() -> str:
+        return os.path.join("benchmarks", "chunks", "detached_jobs.json")
+
+    def _sbatch(self, jobscript_filepath: str) -> str:
+        result = subprocess.run(["sbatch", jobscript_filepath], stdout=subprocess.PIPE)
+        result = result.stdout.decode("utf-8")
+
+        match = re.search(r"Submitted batch job (\d+)", result)
+        if match is None:
+            raise ValueError(f"submitting {jobscript_filepath} failed: {result}")
+
+        return match.group(1)
+
+    def _finished_job_ids(self, job_ids: list[str]) -> set[str]:
+        # listing all own jobs avoids the errors squeue reports for ids that it already forgot
+        result = subprocess.run(["squeue", "--me", "-h", "-o", "%i %t"], stdout=subprocess.PIPE)
+        result = result.stdout.decode("utf-8")
+
+        # finished jobs aren't displayed in the squeue output, the status CG means the job is completing
+        unfinished_ids = set()
+        for line in result.splitlines():
+            fields = line.split()
+            if len(fields) == 2 and fields[1] != "CG":
+                unfinished_ids.add(fields[0])
+
+        return set(job_ids) - unfinished_ids
+
+    def _scancel(self, job_id: str) -> None:
+        subprocess.run(["scancel", job_id], stdout=subprocess.PIPE)
+
+    def _sacct(self, job_id: str) -> list[dict[str, str]]:
+        fields = ["JobName", "ElapsedRaw", "UserCPU", "SystemCPU", "MaxRSS"]
+        result = subprocess.run(["sacct", "-j", job_id, "-n", "-P", f"--format={','.join(fields)}"],
+                                stdout=subprocess.PIPE)
+        result = result.stdout.decode("utf-8")
+
+        return [dict(zip(fields, line.split('|'))) for line in result.splitlines() if line.strip() != '']
+
+    def capacity(self) -> int:
+        return self.max_node_amount
+
+    def plan_job(self, runs: list[RunRequest]) -> JobPlan:
+        tasks, nodes, waves = self._chunk_layout(runs)
+
+        return JobPlan(nodes, tasks, nodes, _predict_waves_duration(runs, waves))
+
+    # returns the tasks of each step, the allocated nodes and the steps of each wave
+    def _chunk_layout(self, runs: list[RunRequest]) -> tuple[int, int, list[list[int]]]:
+        assert len(runs) > 0
+
+        tasks = runs[0].tasks()
+        for r in runs[1:]:
+            assert tasks == r.tasks(), "multiple task amounts in benchmark chunk found"
+
+        nodes = math.ceil(tasks / self.cores_per_node)
+
+        # small benchmarks get packed into waves of concurrent steps, so the allocation needs all cores of the node.
+        # steps that measure hardware counters run alone, concurrent steps on a socket share its memory counters
+        if any(map(lambda r: "perfGroups" in r.params.get("FritzMetaParameters", {}), runs)):
+            waves = list(map(lambda i: [i], range(len(runs))))
+        else:
+            waves = _pack_steps([tasks] * len(runs), nodes * self.cores_per_node)
+
+        return tasks, nodes, waves
+
+    # requests less walltime for chunks whose runs were recorded before, short jobs get scheduled by backfill earlier
+    def _time_limit(self, runs: list[RunRequest], waves: list[list[int]]) -> int:
+        predicted_duration = _predict_waves_duration(runs, waves)
+
+        if predicted_duration is None:
+            return self.default_time_limit
+
+        time_limit = math.ceil(predicted_duration * self.time_limit_margin)
+
+        return max(self.min_time_limit, min(self.max_time_limit, time_limit))
+
+    def _write_jobscript(self, runs: list[RunRequest], chunk_index: int) -> str:
+        fritz_cores_per_node = self.cores_per_node
+
+        for r in runs:
+            assert "FritzMetaParameters" in r.params
+            assert "pinThreads" in r.params["FritzMetaParameters"]
+
+        tasks, nodes, waves = self._chunk_layout(runs)
+        tasks_per_node = min(fritz_cores_per_node, tasks * max(map(len, waves)))
+
+        jobscript_template_filepath = os.path.join(_repository_path, "job_fritz.template")
+
+        with open(jobscript_template_filepath) as f:
+            jobscript_template = f.read()
+
+        jobscript = jobscript_template.replace("__NODES__", str(nodes)).replace("__NTASKS_PER_NODE__",
+                                                                                str(tasks_per_node))
+        jobscript = jobscript.replace("__TIME__", _format_slurm_time(self._time_limit(runs, waves)))
+
+        for wave in waves:
+            core_offset = 0
+
+            for i in wave:
+                run = runs[i]
+                params = run.params
+                # srun __DEPENDANT_SRUN_FLAGS__ __CPU_FREQUENCY__ --output="$3" __THREAD_PINNING__ "$1" "$2"
+
+                dependant_srun_flags = ""
+                cpu_frequency = ""
+                output_filepath = run.run_log_path()
+                thread_pinning = ""
+                binary_path = params["BenchmarkMetaData"]["binary"]
+                param_file_path = os.path.abspath(find_single_prm_file(run.target_dir))
+
+                pinThreadsParameter = params["FritzMetaParameters"]["pinThreads"]
+
+                if tasks < fritz_cores_per_node:
+                    # concurrent steps must not share cores, so every step is pinned to its own range
+                    cpu_list = f"N:{core_offset}-{core_offset + tasks - 1}"
+                else:
+                    cpu_list = "N:scatter"
+
+                if "perfGroups" in params["FritzMetaParameters"]:
+                    # the first rank of every node runs likwid-perfctr, which pins like likwid-pin, the others get pinned
+                    groups = params["FritzMetaParameters"]["perfGroups"].split(',')
+                    perfctr_filepath = os.path.join(os.path.abspath(run.target_dir),
+                                                    build_perfctr_output_filename(run.repetition))
+                    thread_pinning = build_perfctr_command(list(map(str.strip, groups)), cpu_list,
+                                                           pinThreadsParameter == "true", perfctr_filepath)
+                elif pinThreadsParameter == "true":
+                    thread_pinning = f"likwid-pin -q -C {cpu_list}"
+
+                if "frequency" in params["FritzMetaParameters"]:
+                    frequency = params["FritzMetaParameters"]["frequency"]
+                    cpu_frequency = f"--cpu-freq={frequency}-{frequency}:performance"
+
+                if nodes >= 65:
+                    dependant_srun_flags = "-p big"
+
+                core_offset += tasks
+
+                # successful runs publish their log into the result store
+                publish = ""
+                fingerprint = suite_fingerprint(params)
+                if fingerprint is not None:
+                    stored_path = build_stored_run_log_path(fingerprint, run.repetition)
+                    publish = f' && mkdir -p "{os.path.dirname(stored_path)}" && ln -f "{output_filepath}" "{stored_path}"'
+
+                watchdog = ""
+                if self.stall_policy.is_enabled():
+                    watchdog = build_watchdog_command(self.stall_policy, run.target_dir, run.repetition, params) + " "
+
+                suite_path = os.path.abspath(run.target_dir)
+                stderr_filepath = os.path.join(suite_path, build_run_stderr_filename(run.repetition))
+                status_filepath = os.path.join(suite_path, build_run_status_filename(run.repetition))
+
+                status_log = f'echo starting benchmark {output_filepath}'
+                srun_line = f'{{ {watchdog}srun --exact -J run{i} -N {nodes} -n {tasks} {dependant_srun_flags} {cpu_frequency} --output="{output_filepath}" --error="{stderr_filepath}" {thread_pinning} "{binary_path}" "{param_file_path}"; exit_code=$?; write_status $exit_code "{status_filepath}" "{stderr_filepath}"; [ $exit_code -eq 0 ] && echo "{RUN_COMPLETE_MARKER}" >> "{output_filepath}"{publish}; }} &'
+                jobscript += f'\n{status_log}\n{srun_line}'
+
+            jobscript += '\nwait\n'
+
+        jobscript_filepath = os.path.join("benchmarks", "chunks", f"chunk{chunk_index}_job_fritz.sh")
+
+        with open(jobscript_filepath, 'w') as f:
+            f.write(jobscript)
+
+        return jobscript_filepath
+
+
+# runs the generated job scripts locally instead of submitting them, srun and likwid are replaced by the stubs
+# in the stubs directory, BA_FAKE_SLURM_CORES limits the cores the running jobs may allocate together
+@register_backend("fake-slurm")
+class FakeSlurmBackend(SlurmBackend):
+    waits_for_jobs = True
+    max_poll_interval = 1
+
+    _core_budget: int
+    _next_job_id: int
+    _queue: list[tuple[str, str, int]]
+    _running: dict[str, tuple[Popen, int]]
+
+    def __init__(self, multicore: bool):
+        super().__init__(multicore)
+
+        self._core_budget = int(os.environ.get("BA_FAKE_SLURM_CORES", os.cpu_count()))
+        self._next_job_id = 1
+        self._queue = []
+        self._running = {}
+
+    def _sbatch(self, jobscript_filepath: str) -> str:
+        with open(jobscript_filepath) as f:
+            jobscript = f.read()
+
+        nodes = re.search(r"#SBATCH --nodes=(\d+)", jobscript)
+        tasks_per_node = re.search(r"#SBATCH --ntasks-per-node=(\d+)", jobscript)
+        assert nodes is not None and tasks_per_node is not None, f"{jobscript_filepath} misses the allocation size"
+
+        job_id = str(self._next_job_id)
+        self._next_job_id += 1
+
+        self._queue.append((job_id, jobscript_filepath, int(nodes.group(1)) * int(tasks_per_node.group(1))))
+        self._start_queued_jobs()
+
+        return job_id
+
+    def _start_queued_jobs(self) -> None:
+        for job_id, (process, _) in list(self._running.items()):
+            if process.poll() is not None:
+                del self._running[job_id]
+
+        # first come first served, oversized jobs run as soon as nothing else runs
+        while len(self._queue) > 0:
+            job_id, jobscript_filepath, cores = self._queue[0]
+            allocated_cores = sum(map(lambda r: r[1], self._running.values()))
+
+            if len(self._running) > 0 and allocated_cores + cores > self._core_budget:
+                break
+
+            self._queue.pop(0)
+
+            env = dict(os.environ)
+            env["PATH"] = os.path.abspath(os.path.join(_repository_path, "stubs")) + os.pathsep + env["PATH"]
+            env["SLURM_JOB_ID"] = job_id
+            env["FAKE_SLURM_ACCOUNTING"] = self._build_accounting_filepath(job_id)
+
+            # job ids restart with every runner, so accounting of an earlier runner may still be there
+            if os.path.isfile(env["FAKE_SLURM_ACCOUNTING"]):
+                os.unlink(env["FAKE_SLURM_ACCOUNTING"])
+
+            # no login shell, it would reset the PATH to the real srun
+            process = Popen(["bash", jobscript_filepath], env=env, start_new_session=True,
+                            stdout=subprocess.DEVNULL)
+            self._running[job_id] = (process, cores)
+            _logger.info(f"fake slurm started job {job_id} with {cores} cores")
+
+    def _finished_job_ids(self, job_ids: list[str]) -> set[str]:
+        self._start_queued_jobs()
+
+        unfinished_ids = set(map(lambda q: q[0], self._queue)) | set(self._running.keys())
+
+        return set(job_ids) - unfinished_ids
+
+    def _scancel(self, job_id: str) -> None:
+        self._queue = list(filter(lambda q: q[0] != job_id, self._queue))
+
+        if job_id in self._running:
+            process, _ = self._running[job_id]
+            if process.poll() is None:
+                # watchdogs get the chance to stop the steps they moved into their own process groups
+                os.killpg(process.pid, signal.SIGTERM)
+                try:
+                    process.wait(10)
+                except subprocess.TimeoutExpired:
+                    os.killpg(process.pid, signal.SIGKILL)
+                    process.wait()
+
+    # fake jobs die with the runner, so they are never detached
+    def restore_detached_jobs(self) -> list[BenchmarkJob]:
+        return []
+
+    def _sacct(self, job_id: str) -> list[dict[str, str]]:
+        accounting_filepath = self._build_accounting_filepath(job_id)
+        if not os.path.isfile(accounting_filepath):
+            return []
+
+        with open(accounting_filepath) as f:
+            lines = f.read().splitlines()
+
+        # the srun stub appends one line per step
+        return [dict(field.split('=', 1) for field in line.split('|')) for line in lines if line.strip() != '']
+
+    @staticmethod
+    def _build_accounting_filepath(job_id: str) -> str:
+        return os.path.abspath(os.path.join("benchmarks", "chunks", f"fake_slurm_{job_id}.acct"))
+
+
+# the steps of a wave run concurrently, the waves one after another, None if a run has no recorded runtime
+def _predict_waves_duration(runs: list[RunRequest], waves: list[list[int]]) -> float | None:
+    predicted_durations = list(map(lambda r: predict_run_duration(r.params), runs))
+
+    if any(map(lambda d: d is None, predicted_durations)):
+        return None
+
+    return sum(map(lambda w: max(map(lambda i: predicted_durations[i], w)), waves))
+
+
+def _format_slurm_time(seconds: int) -> str:
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+# first fit packing of steps into waves of concurrently running steps, returns the step indices of each wave
+# steps that are larger than the capacity get a wave of their own
+def _pack_steps(step_tasks: list[int], capacity: int) -> list[list[int]]:
+    waves: list[list[int]] = []
+    wave_tasks: list[int] = []
+
+    for i, tasks in enumerate(step_tasks):
+        for w in range(len(waves)):
+            if wave_tasks[w] + tasks <= capacity:
+                waves[w].append(i)
+                wave_tasks[w] += tasks
+                break
+        else:
+            waves.append([i])
+            wave_tasks.append(tasks)
+
+    return waves
@@ -0,0 +1,124 @@
+import os
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Iterable, Iterator, TypeVar
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+def _is_up_to_date(bin_folder: str, target: str | None) -> bool:
+    # make -q only reports the state via its exit code, 0 means there is nothing to be done
+    # generated makefiles with phony targets always report 1, these are simply rebuilt
+    command = ['make', '-q']
+    if target is not None:
+        command.append(target)
+
+    result = subprocess.run(command, cwd=bin_folder, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    return result.returncode == 0
+
+
+def _has_makefile(bin_folder: str) -> bool:
+    return any(map(lambda name: os.path.isfile(os.path.join(bin_folder, name)), ["GNUmakefile", "makefile", "Makefile"]))
+
+
+def _build_project(bin_folder: str, make_jobs: int, target: str | None = None) -> bool:
+    # binaries without a build, e.g. stubs/fake_hyteg.py, are used as they are if they exist
+    if not _has_makefile(bin_folder):
+        binary_path = os.path.join(bin_folder, target) if target is not None else None
+        if binary_path is not None and os.path.isfile(binary_path) and os.access(binary_path, os.X_OK):
+            _logger.info(f"{bin_folder} has no Makefile, using {binary_path} as it is")
+            return True
+
+        print(f"binary {binary_path} doesn't exist or isn't executable and {bin_folder} has no Makefile, "
+              f"skipping the suites that need it")
+        _logger.error(f"binary {binary_path} doesn't exist or isn't executable and {bin_folder} has no Makefile")
+        return False
+
+    if _is_up_to_date(bin_folder, target):
+        _logger.info(f"{bin_folder} is up to date")
+        return True
+
+    print(f"compiling {bin_folder}")
+    _logger.info(f"compiling {bin_folder}")
+
+    command = ['make', '-j', str(make_jobs)]
+    if target is not None:
+        command.append(target)
+
+    result = subprocess.run(command, cwd=bin_folder)
+
+    if result.returncode != 0:
+        print(f"compiling {bin_folder} failed with exit code {result.returncode}, skipping the suites that need it")
+        _logger.error(f"compiling {bin_folder} failed with exit code {result.returncode}")
+        return False
+
+    return True
+
+
+class ProjectBuilder:
+    make_jobs: int
+
+    _executor: ThreadPoolExecutor
+    # keyed by folder and target
+    _builds: dict[tuple[str, str], Future]
+
+    def __init__(self, make_jobs: int):
+        self.make_jobs = make_jobs
+
+        # every make already runs make_jobs compile jobs, so builds happen one after another,
+        # which also keeps makes of different targets from racing in the same folder.
+        # suites whose binaries are built still run while the remaining binaries compile
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._builds = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # builds that haven't started yet aren't needed anymore if something went wrong
+        self._executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+
+    # starts building the binary in its folder, every distinct binary is only built once
+    def build(self, binary_path: str) -> Future:
+        key = (os.path.dirname(binary_path), os.path.basename(binary_path))
+
+        if key not in self._builds:
+            self._builds[key] = self._executor.submit(_build_project, key[0], self.make_jobs, key[1])
+
+        return self._builds[key]
+
+    # yields the items in the order their binaries finish building, items whose binaries failed to build are dropped,
+    # binaries_of has to return the binary paths every item needs
+    def when_built(self, items: Iterable[T], binaries_of: Callable[[T], list[str]]) -> Iterator[T]:
+        pending = []
+
+        # items that are ready are handed out while the remaining items are still being discovered
+        for item in items:
+            pending.append((item, [self.build(binary) for binary in binaries_of(item)]))
+            yield from _take_ready(pending)
+
+        while len(pending) > 0:
+            ready = list(_take_ready(pending))
+
+            if len(ready) == 0:
+                running = [f for _, futures in pending for f in futures if not f.done()]
+                wait(running, return_when=FIRST_COMPLETED)
+                continue
+
+            yield from ready
+
+
+def _take_ready(pending: list[tuple[T, list[Future]]]) -> Iterator[T]:
+    ready = list(filter(lambda p: all(map(lambda f: f.done(), p[1])), pending))
+
+    for p in ready:
+        pending.remove(p)
+
+        # rethrows exceptions from the build threads, failed builds were already reported
+        if all(list(map(lambda f: f.result(), p[1]))):
+            yield p[0]
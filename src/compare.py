@@ -10,7 +10,8 @@ def compare_existing_logs(dirs: list[str], benchmarks: list[str], metrics: list[
                           x_axis: str = "iterations", y_axis: list[str] | None = None, x_axis_name: str | None = None,
                           y_axis_name: str | None = None, plot_title: str | None = None) -> None:
     b_iter = BenchmarkIterator(dirs)
-    extracted_benchmarks = map(lambda d: (d, extract_benchmarks(d)), b_iter)
+    derived_metrics = metrics + [x_axis] + (y_axis or [])
+    extracted_benchmarks = map(lambda d: (d, extract_benchmarks(d, derived_metrics)), b_iter)
     restricted_benchmarks = map(lambda b: (b[0], restrict_benchmarks(b[1], benchmarks, metrics)), extracted_benchmarks)
     suites = map(lambda b: (os.path.basename(b[0]), b[1]), restricted_benchmarks)
     suites = list(
@@ -1,6 +1,10 @@
 import os
 import copy
-from src.utils import BenchmarkIterator, find_prm_files, format_prm_file, parse_prm_file, find_single_prm_file
+import itertools
+
+from src.meshgen import calculate_3d_mesh_config
+from src.utils import BenchmarkIterator, find_prm_files, format_prm_file, parse_prm_file, find_single_prm_file, \
+    convert_to_valid_filename, write_file_atomically
 
 _default_config = {
     "BenchmarkMetaData": {
@@ -63,9 +67,10 @@ _alternatives_to_defaults = {
 
 
 def _parse_assignment(assignment: str) -> tuple[tuple[str, str], str]:
-    assert assignment.count('=') == 1, 'config field assignments must have exactly one "="'
+    # values may contain further "=", e.g. adaptive repeat specifications
+    assert '=' in assignment, 'config field assignments must contain a "="'
 
-    key, value = assignment.split('=')
+    key, value = assignment.split('=', 1)
     assert key.count('.') <= 1, 'config field assignment keys cant have more than one dot'
 
     if '.' in key:
@@ -162,7 +167,8 @@ def _get_env_dependent_values() -> str:
     env = os.environ.get('BA_BENCHMARKING_UTILITIES_ENV')
     if env == "laptop":
         ba_path = os.path.join('/', 'home', 'pg', 'Documents', 'uni', 'bachelor', 'fs7', 'Bachelorarbeit')
-    elif env == "fritz":
+    elif env == "fritz" or env == "fake-slurm":
+        # fake-slurm runs the fritz job scripts locally
         ba_path = os.path.join('/', 'home', 'hpc', 'iwia', 'iwia123h')
     else:
         raise ValueError(f"BA_BENCHMARKING_UTILITIES_ENV has invalid value {env}")
@@ -170,46 +176,88 @@ def _get_env_dependent_values() -> str:
     return ba_path
 
 
-def set_configs(directory_path: str, assignments: list[str], set_defaults: bool, add_missing_defaults: bool) -> None:
+def set_configs(directory_path: str, assignments: list[str], set_defaults: bool, add_missing_defaults: bool,
+                show_diff: bool = False, jobs: int | None = None) -> None:
     ba_path = _get_env_dependent_values()
 
+    suites = list(BenchmarkIterator(directory_path))
+    tasks = list(map(lambda b: (b, ba_path, assignments, set_defaults, add_missing_defaults), suites))
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    # starting worker processes only pays off for large trees
+    if jobs > 1 and len(suites) >= _parallel_config_threshold:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(jobs) as executor:
+            rendered = list(executor.map(_render_suite_configs, tasks, chunksize=32))
+    else:
+        rendered = list(map(_render_suite_configs, tasks))
+
+    changes = [c for configs in rendered for c in configs if c[1] != c[2]]
+
+    if show_diff:
+        import difflib
+
+    for path, old_text, new_text in changes:
+        if show_diff:
+            print(''.join(difflib.unified_diff(old_text.splitlines(keepends=True), new_text.splitlines(keepends=True),
+                                               path, path)), end='')
+        else:
+            # jobs may read the config at any time, so it is never truncated
+            write_file_atomically(path, new_text)
+
+    config_amount = sum(map(len, rendered))
+    if show_diff:
+        print(f"{len(changes)} of {config_amount} configs would change")
+    else:
+        print(f"updated {len(changes)} of {config_amount} configs")
+
+
+# at least this many suites are rendered by worker processes
+_parallel_config_threshold = 64
+
+
+# (path, current content, new content) of every config of the suite
+def _render_suite_configs(task: tuple[str, str, list[str], bool, bool]) -> list[tuple[str, str, str]]:
+    b, ba_path, assignments, set_defaults, add_missing_defaults = task
+
     if set_defaults:
         config = init_default_config(ba_path)
-        config.set_assignments(assignments)
-
-    benchmark_iter = BenchmarkIterator(directory_path)
-
-    for b in benchmark_iter:
-        if not set_defaults:
-            # todo if existing config misses BenchmarkMetaData this fails, even if --add-missing-defaults is set
-            config = init_existing_config(b, ba_path)
-            config.set_assignments(assignments)
-
-        config.set_individual_fields(b)
-
-        # todo if this would happen before config.set_assignemnts, one could edit the added defaults in the cmd line call
-        # todo don't add fields whose alternatives are already set
-        if add_missing_defaults:
-            for block in _default_config:
-                if block not in config.fields:
-                    config.fields[block] = _default_config[block]
-                    continue
-
-                for field in _default_config[block]:
-                    if field not in config.fields[block]:
-                        if field in _alternatives_to_defaults:
-                            alternative_is_set = map(lambda a: a in config.fields[block],
-                                                     _alternatives_to_defaults[field])
-                            if not any(alternative_is_set):
-                                config.fields[block][field] = _default_config[block][field]
-                        else:
+    else:
+        # todo if existing config misses BenchmarkMetaData this fails, even if --add-missing-defaults is set
+        config = init_existing_config(b, ba_path)
+
+    config.set_assignments(assignments)
+    config.set_individual_fields(b)
+
+    # todo if this would happen before config.set_assignemnts, one could edit the added defaults in the cmd line call
+    # todo don't add fields whose alternatives are already set
+    if add_missing_defaults:
+        for block in _default_config:
+            if block not in config.fields:
+                config.fields[block] = copy.deepcopy(_default_config[block])
+                continue
+
+            for field in _default_config[block]:
+                if field not in config.fields[block]:
+                    if field in _alternatives_to_defaults:
+                        alternative_is_set = map(lambda a: a in config.fields[block],
+                                                 _alternatives_to_defaults[field])
+                        if not any(alternative_is_set):
                             config.fields[block][field] = _default_config[block][field]
+                    else:
+                        config.fields[block][field] = _default_config[block][field]
+
+    new_text = str(config)
+    configs = []
 
-        prm_files = find_prm_files(b)
+    for f in find_prm_files(b):
+        with open(f, 'r') as file:
+            configs.append((f, file.read(), new_text))
 
-        for f in prm_files:
-            with open(f, 'w') as file:
-                file.write(str(config))
+    return configs
 
 
 def prep_fresh_directory(target_dir: str):
@@ -220,13 +268,132 @@ def prep_fresh_directory(target_dir: str):
 def create_config(directory_path: str, assignments: list[str]) -> None:
     ba_path = _get_env_dependent_values()
 
-    os.makedirs(directory_path, exist_ok=True)
-
     config = init_default_config(ba_path)
     config.set_assignments(assignments)
+
+    _write_new_suite(directory_path, config)
+
+
+def _write_new_suite(directory_path: str, config: BenchmarkConfig) -> None:
+    os.makedirs(directory_path, exist_ok=True)
+
     config.set_individual_fields(directory_path)
 
     with open(os.path.join(directory_path, 'Parameters.prm'), 'w') as f:
         f.write(str(config))
 
     prep_fresh_directory(directory_path)
+
+
+class SweepAxis:
+    block: str
+    field: str
+    values: list[str]
+
+    def __init__(self, block: str, field: str, values: list[str]):
+        self.block = block
+        self.field = field
+        self.values = values
+
+
+# <Block>.<field>=<value>,<value>,...
+def parse_sweep_axis(text: str) -> SweepAxis:
+    (block, field), values = _parse_assignment(text)
+    values = list(map(str.strip, values.split(',')))
+
+    assert all(map(lambda v: v != '', values)), f"sweep axis {text} contains empty values"
+
+    return SweepAxis(block, field, values)
+
+
+# every point assigns one value of each axis, zipped axes advance together instead of forming all combinations
+def sweep_points(axes: list[SweepAxis], zipped: bool) -> list[list[tuple[SweepAxis, str]]]:
+    value_lists = list(map(lambda a: [(a, v) for v in a.values], axes))
+
+    if zipped:
+        assert len(set(map(lambda a: len(a.values), axes))) <= 1, "zipped sweep axes need the same amount of values"
+        return list(map(list, zip(*value_lists)))
+
+    return list(map(list, itertools.product(*value_lists)))
+
+
+# one directory level per axis, e.g. chebyshevOrder_2/cycleType_w
+def build_sweep_suite_path(root: str, point: list[tuple[SweepAxis, str]]) -> str:
+    levels = map(lambda p: convert_to_valid_filename(f"{p[0].field}_{p[1]}"), point)
+
+    return os.path.join(root, *levels)
+
+
+# creates a suite for every point of the sweep below root, returns the suite paths
+def create_sweep(root: str, axes: list[SweepAxis], zipped: bool, assignments: list[str], dry_run: bool) -> list[str]:
+    assert len(axes) > 0, "a sweep needs at least one axis"
+
+    points = sweep_points(axes, zipped)
+    suite_paths = list(map(lambda p: build_sweep_suite_path(root, p), points))
+
+    assert len(set(suite_paths)) == len(suite_paths), "sweep axes produce duplicate suite directories"
+
+    if dry_run:
+        return suite_paths
+
+    ba_path = _get_env_dependent_values()
+
+    base_config = init_default_config(ba_path)
+    base_config.set_assignments(assignments)
+
+    for suite_path, point in zip(suite_paths, points):
+        config = copy.deepcopy(base_config)
+
+        for axis, value in point:
+            config.update_field(axis.block, axis.field, value)
+
+        _write_new_suite(suite_path, config)
+
+    return suite_paths
+
+
+# weak studies keep tets_per_thread tets per task, strong ones distribute the tets of the smallest task count
+def create_scaling_study(root: str, name: str, task_counts: list[int], tets_per_thread: int, mode: str,
+                         tets_per_block: int, assignments: list[str], dry_run: bool) \
+        -> list[tuple[str, int, tuple[int, int, int]]]:
+    from src.scaling import SCALING_STUDY_BLOCK, SCALING_MODES, build_scaling_study_block
+
+    assert mode in SCALING_MODES, f"scaling mode must be one of {', '.join(SCALING_MODES)}"
+    assert len(task_counts) > 0, "a scaling study needs at least one task count"
+    assert len(set(task_counts)) == len(task_counts), "task counts of a scaling study must be unique"
+
+    task_counts = sorted(task_counts)
+    base_tasks = task_counts[0]
+
+    points = []
+    for tasks in task_counts:
+        if mode == "weak":
+            total_tets = tasks * tets_per_thread
+        else:
+            total_tets = base_tasks * tets_per_thread
+
+        suite_path = os.path.join(root, convert_to_valid_filename(f"tasks_{tasks}"))
+        points.append((suite_path, tasks, total_tets, calculate_3d_mesh_config(total_tets, tets_per_block)))
+
+    if dry_run:
+        return list(map(lambda p: (p[0], p[1], p[3]), points))
+
+    ba_path = _get_env_dependent_values()
+
+    base_config = init_default_config(ba_path)
+    # meshX/Y/Z replace the mesh file
+    base_config.update_field("Parameters", "meshFile", '')
+    base_config.set_assignments(assignments)
+
+    for suite_path, tasks, total_tets, (x, y, z) in points:
+        config = copy.deepcopy(base_config)
+
+        config.update_field("BenchmarkMetaData", "tasks", tasks)
+        config.update_field("Parameters", "meshX", x)
+        config.update_field("Parameters", "meshY", y)
+        config.update_field("Parameters", "meshZ", z)
+        config.fields[SCALING_STUDY_BLOCK] = build_scaling_study_block(name, mode, base_tasks, total_tets)
+
+        _write_new_suite(suite_path, config)
+
+    return list(map(lambda p: (p[0], p[1], p[3]), points))
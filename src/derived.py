@@ -0,0 +1,183 @@
+from dataclasses import dataclass
+from typing import Callable
+
+from src.Benchmark import Benchmark, MetricDeclaration
+
+# a column holds one value per measurement of a benchmark, None where the value doesn't exist
+Column = list[float | None]
+
+
+# metrics computed from the printed metrics of a benchmark and constants of the suite, e.g. its dofs.
+# evaluate gets the columns of the benchmark (including "iterations" and the derived metrics declared before it)
+# and the constants, it's only called if all inputs exist
+@dataclass
+class DerivedMetric:
+    name: str
+    inputs: list[str]
+    evaluate: Callable[[dict[str, Column], dict[str, float]], Column]
+
+
+_derived_metrics: list[DerivedMetric] = []
+
+
+def register_derived_metric(name: str, inputs: list[str]):
+    def register(evaluate: Callable[[dict[str, Column], dict[str, float]], Column]):
+        _derived_metrics.append(DerivedMetric(name, inputs, evaluate))
+        return evaluate
+
+    return register
+
+
+def _elementwise(operation: Callable[[float, float], float | None], a: Column, b: Column) -> Column:
+    return [None if x is None or y is None else operation(x, y) for x, y in zip(a, b)]
+
+
+def _divide(x: float, y: float) -> float | None:
+    return None if y == 0 else x / y
+
+
+def _constant(value: float, like: Column) -> Column:
+    return [value] * len(like)
+
+
+def _shifted(column: Column) -> Column:
+    return [None] + column[:-1]
+
+
+def _cumulative_sum(column: Column) -> Column:
+    sums = []
+    total = 0.0
+
+    for v in column:
+        if v is None:
+            sums.append(None)
+            continue
+
+        total += v
+        sums.append(total)
+
+    return sums
+
+
+# asymptotic convergence factor r_l2[i] / r_l2[i - 1]
+@register_derived_metric("convergence_factor", ["r_l2"])
+def _convergence_factor(columns: dict[str, Column], constants: dict[str, float]) -> Column:
+    return _elementwise(_divide, columns["r_l2"], _shifted(columns["r_l2"]))
+
+
+# time is the duration of a single iteration
+@register_derived_metric("cumulative_time", ["time"])
+def _cumulative_time(columns: dict[str, Column], constants: dict[str, float]) -> Column:
+    return _cumulative_sum(columns["time"])
+
+
+# average time of the iterations up to this one, iterations start at 0
+@register_derived_metric("time_per_iteration", ["cumulative_time"])
+def _time_per_iteration(columns: dict[str, Column], constants: dict[str, float]) -> Column:
+    return _elementwise(_divide, columns["cumulative_time"], list(map(lambda i: i + 1, columns["iterations"])))
+
+
+# only benchmarks that time their iterations are solvers working on the dofs
+@register_derived_metric("dofs", ["dofs", "time"])
+def _dofs(columns: dict[str, Column], constants: dict[str, float]) -> Column:
+    return _constant(constants["dofs"], columns["iterations"])
+
+
+@register_derived_metric("dofs_per_second", ["dofs", "time"])
+def _dofs_per_second(columns: dict[str, Column], constants: dict[str, float]) -> Column:
+    return _elementwise(_divide, columns["dofs"], columns["time"])
+
+
+@register_derived_metric("time_per_dof", ["dofs", "time"])
+def _time_per_dof(columns: dict[str, Column], constants: dict[str, float]) -> Column:
+    return _elementwise(_divide, columns["time"], columns["dofs"])
+
+
+# linear elements on the finest level, the meshX * meshY * meshZ cubes are refined maxLevel times
+# None if the mesh isn't given by its dimensions
+def count_dofs(prm: dict[str, dict[str, str]]) -> float | None:
+    parameters = prm.get("Parameters", {})
+
+    if "maxLevel" not in parameters:
+        return None
+
+    if all(map(lambda f: f in parameters, ["meshX", "meshY", "meshZ"])):
+        mesh = list(map(lambda f: int(parameters[f]), ["meshX", "meshY", "meshZ"]))
+    elif parameters.get("meshFile", '').endswith("cube_6el.msh"):
+        # the default mesh is a single cube
+        mesh = [1, 1, 1]
+    else:
+        return None
+
+    cells_per_side = 2 ** int(parameters["maxLevel"])
+
+    dofs = 1
+    for m in mesh:
+        dofs *= m * cells_per_side + 1
+
+    return float(dofs)
+
+
+def _suite_constants(prm: dict[str, dict[str, str]]) -> dict[str, float]:
+    constants = {}
+
+    dofs = count_dofs(prm)
+    if dofs is not None:
+        constants["dofs"] = dofs
+
+    return constants
+
+
+def _benchmark_columns(benchmark: Benchmark) -> dict[str, Column]:
+    columns: dict[str, Column] = {"iterations": list(map(lambda m: float(m.iteration), benchmark.measurements))}
+
+    for metric in benchmark.decl.metrics:
+        columns[metric.name] = []
+
+    for m in benchmark.measurements:
+        values = dict(m.values)
+
+        for metric in benchmark.decl.metrics:
+            value = values.get(metric.name)
+            columns[metric.name].append(None if value is None else float(value))
+
+    return columns
+
+
+# adds the wanted derived metrics whose inputs the benchmark or the suite provide, printed metrics take precedence.
+# derived metrics that aren't wanted are only computed as inputs, so they don't crowd the default plots
+def add_derived_metrics(benchmarks: list[Benchmark], prm: dict[str, dict[str, str]],
+                        wanted_metrics: list[str] | None) -> None:
+    if wanted_metrics is None or not any(map(lambda d: d.name in wanted_metrics, _derived_metrics)):
+        return
+
+    constants = _suite_constants(prm)
+
+    for b in benchmarks:
+        if len(b.measurements) == 0:
+            continue
+
+        columns = _benchmark_columns(b)
+
+        for derived in _derived_metrics:
+            if derived.name in columns:
+                continue
+
+            if not all(map(lambda i: i in columns or i in constants, derived.inputs)):
+                continue
+
+            column = derived.evaluate(columns, constants)
+            assert len(column) == len(b.measurements), f"derived metric {derived.name} has the wrong length"
+
+            columns[derived.name] = column
+
+            if derived.name not in wanted_metrics:
+                continue
+
+            declaration = MetricDeclaration(derived.name, 'float')
+            b.decl.metrics.append(declaration)
+            b.active_metrics.append(declaration)
+
+            for m, value in zip(b.measurements, column):
+                if value is not None:
+                    m.values.append((derived.name, str(value)))
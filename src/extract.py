@@ -1,8 +1,17 @@
 import os
 import re
+import sys
 
 from src.Benchmark import Benchmark, BenchmarkDeclaration, MetricDeclaration, MetricsMeasurement
-from src.utils import load_prm_file, build_run_log_filename, list_flatten
+from src.accounting import read_run_usage, build_usage_benchmark
+from src.derived import add_derived_metrics
+from src.perfctr import read_run_perfctr_metrics, build_perfctr_benchmark
+from src.status import read_run_status
+from src.utils import load_prm_file, build_run_log_filename, list_flatten, parse_repeat_spec, count_repetitions
+
+import logging
+
+_logger = logging.getLogger(__name__)
 
 
 def restrict_benchmarks(benchmarks: list[Benchmark], wanted_benchmarks: list[str] | None,
@@ -17,7 +26,8 @@ def restrict_benchmarks(benchmarks: list[Benchmark], wanted_benchmarks: list[str
     return benchmarks
 
 
-def extract_benchmarks(target_dir: str) -> list[Benchmark]:
+# only the derived metrics named in wanted_metrics are added
+def extract_benchmarks(target_dir: str, wanted_metrics: list[str] | None = None) -> list[Benchmark]:
     prm = load_prm_file(target_dir)
 
     if "BenchmarkMetaData" not in prm:
@@ -29,13 +39,39 @@ def extract_benchmarks(target_dir: str) -> list[Benchmark]:
     if "reduce" not in prm["BenchmarkMetaData"]:
         raise ValueError(f"config of {target_dir} does not contain a reduce value")
 
-    repetitions_amount = int(prm["BenchmarkMetaData"]["repeat"])
+    repetitions_amount = count_repetitions(target_dir, parse_repeat_spec(prm["BenchmarkMetaData"]["repeat"]))
+    if repetitions_amount == 0:
+        raise ValueError(f"{target_dir} has no run logs")
+
     reduce_type = prm["BenchmarkMetaData"]["reduce"]
 
-    benchmark_runs = []
+    # failed runs left truncated logs, they are reported instead of being reduced
+    repetitions = []
     for i in range(repetitions_amount):
+        status = read_run_status(target_dir, i)
+
+        if status is not None and status.failed():
+            # stdout may carry a table
+            print(f"skipping run {i} of {target_dir}, it failed with {status.describe()}", file=sys.stderr)
+            _logger.info(f"skipping run {i} of {target_dir}, it failed with {status.describe()}")
+        else:
+            repetitions.append(i)
+
+    if len(repetitions) == 0:
+        raise ValueError(f"all runs of {target_dir} failed, rerun them with run --failed-only")
+
+    repetitions_amount = len(repetitions)
+
+    benchmark_runs = []
+    for i in repetitions:
         run_log_path = os.path.join(target_dir, build_run_log_filename(i))
-        benchmark_runs.append(_extract_run_log(run_log_path))
+        benchmark_runs.append(extract_run_log(run_log_path))
+
+    usage = list(map(lambda i: read_run_usage(target_dir, i), repetitions))
+    _append_run_benchmarks(benchmark_runs, usage, build_usage_benchmark)
+
+    counters = list(map(lambda i: read_run_perfctr_metrics(target_dir, i), repetitions))
+    _append_run_benchmarks(benchmark_runs, counters, build_perfctr_benchmark)
 
     reduced_benchmarks = []
     benchmark_names = list(map(lambda b: b.decl.name, benchmark_runs[0]))
@@ -113,10 +149,26 @@ def extract_benchmarks(target_dir: str) -> list[Benchmark]:
 
         reduced_benchmarks.append(reduced_benchmark)
 
+    add_derived_metrics(reduced_benchmarks, prm, wanted_metrics)
+
     return reduced_benchmarks
 
 
-def _extract_run_log(run_log_path: str) -> list[Benchmark]:
+# data recorded next to the run logs is only comparable if every run has it with the same metrics
+def _append_run_benchmarks(benchmark_runs: list[list[Benchmark]], records: list, build_benchmark) -> None:
+    if not all(map(lambda r: r is not None, records)):
+        return
+
+    run_benchmarks = list(map(build_benchmark, records))
+    run_metrics = list(map(lambda b: [m.name for m in b.decl.metrics], run_benchmarks))
+
+    if all(map(lambda m: m == run_metrics[0], run_metrics)):
+        for run, run_benchmark in zip(benchmark_runs, run_benchmarks):
+            run.append(run_benchmark)
+
+
+# the benchmarks of a single run log as printed, without reducing the runs or derived metrics
+def extract_run_log(run_log_path: str) -> list[Benchmark]:
     if not os.path.isfile(run_log_path):
         raise ValueError(f"Run log file not found at {run_log_path}")
 
@@ -0,0 +1,79 @@
+import re
+from dataclasses import dataclass
+
+from src.Benchmark import Benchmark
+
+# benchmarks like NG_inner_mg_0, NG_inner_mg_1, ... are the inner solves of the outer iterations 0, 1, ...
+_family_member_pattern = re.compile(r'(.+)_(\d+)')
+
+
+@dataclass
+class BenchmarkFamily:
+    name: str
+    metrics: list[str]
+    # values[metric][outer][inner], None where an inner solve took fewer iterations than the longest one
+    values: dict[str, list[list[float | None]]]
+    # how many iterations the inner solve of every outer iteration took, counted from the measurements
+    # since metrics like convergence_factor don't have a value in every iteration
+    iterations: list[int]
+
+    def outer_iterations(self) -> int:
+        return len(self.iterations)
+
+    def inner_iterations(self) -> list[int]:
+        return self.iterations
+
+    # the inner work of every outer iteration, i.e. the sum of the metric over the inner iterations
+    def inner_totals(self, metric: str) -> list[float]:
+        return list(map(lambda row: sum(filter(lambda v: v is not None, row)), self.values[metric]))
+
+
+def split_family_member_name(name: str) -> tuple[str, int] | None:
+    match = _family_member_pattern.fullmatch(name)
+
+    if match is None:
+        return None
+
+    return match.group(1), int(match.group(2))
+
+
+# assembles the indexed benchmarks of every family into one (outer, inner) array per metric
+# outer iterations without an inner benchmark get empty rows
+def find_benchmark_families(benchmarks: list[Benchmark]) -> list[BenchmarkFamily]:
+    members: dict[str, dict[int, Benchmark]] = {}
+
+    for b in benchmarks:
+        split = split_family_member_name(b.decl.name)
+
+        if split is not None:
+            members.setdefault(split[0], {})[split[1]] = b
+
+    families = []
+    for name, indexed in members.items():
+        metrics = list(map(lambda m: m.name, indexed[min(indexed.keys())].active_metrics))
+        width = max(map(lambda b: max(map(lambda m: m.iteration, b.measurements), default=-1) + 1, indexed.values()))
+
+        outer_range = range(max(indexed.keys()) + 1)
+        iterations = list(map(lambda o: len(set(map(lambda m: m.iteration, indexed[o].measurements)))
+                              if o in indexed else 0, outer_range))
+
+        values = {}
+        for metric in metrics:
+            rows = []
+
+            for outer in outer_range:
+                row: list[float | None] = [None] * width
+
+                if outer in indexed:
+                    for m in indexed[outer].measurements:
+                        value = dict(m.values).get(metric)
+                        if value is not None:
+                            row[m.iteration] = float(value)
+
+                rows.append(row)
+
+            values[metric] = rows
+
+        families.append(BenchmarkFamily(name, metrics, values, iterations))
+
+    return families
@@ -0,0 +1,37 @@
+import os
+import re
+
+from src.accounting import read_run_usage
+from src.store import get_store_path, suite_fingerprint
+
+
+# wall times of all runs of equivalent suites that were published to the result store
+def recorded_wall_times(fingerprint: str) -> list[float]:
+    stored_dir = os.path.join(get_store_path(), fingerprint)
+    if not os.path.isdir(stored_dir):
+        return []
+
+    wall_times = []
+    for filename in os.listdir(stored_dir):
+        match = re.fullmatch(r"run(\d+)\.usage\.json", filename)
+        if match is None:
+            continue
+
+        usage = read_run_usage(stored_dir, int(match.group(1)))
+        if usage is not None:
+            wall_times.append(usage.wall_time)
+
+    return wall_times
+
+
+# duration of the slowest recorded run of an equivalent suite in seconds, None without history
+def predict_run_duration(params: dict[str, dict[str, str]]) -> float | None:
+    fingerprint = suite_fingerprint(params)
+    if fingerprint is None:
+        return None
+
+    wall_times = recorded_wall_times(fingerprint)
+    if len(wall_times) == 0:
+        return None
+
+    return max(wall_times)
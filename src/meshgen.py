@@ -1,34 +1,93 @@
-import math
+def _prime_factors(n: int) -> dict[int, int]:
+    factors = {}
+    p = 2
 
+    while p * p <= n:
+        while n % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+        p += 1 if p == 2 else 2
 
+    if n > 1:
+        factors[n] = factors.get(n, 0) + 1
+
+    return factors
+
+
+def _divisors(n: int) -> list[int]:
+    divisors = [1]
+
+    for p, exponent in _prime_factors(n).items():
+        divisors = [d * p ** e for d in divisors for e in range(exponent + 1)]
+
+    return sorted(divisors)
+
+
+# the (x, y, z) with x <= y <= z and x * y * z * tets_per_block == total_tets whose sides differ the least
 def calculate_3d_mesh_config(total_tets: int, tets_per_block: int) -> tuple[int, int, int]:
     if total_tets % tets_per_block != 0:
         raise ValueError('total_tets must be divisible by tets_per_block')
 
-    wanted_blocks = math.ceil(total_tets / tets_per_block)
-    configs = []
+    wanted_blocks = total_tets // tets_per_block
+    if wanted_blocks < 1:
+        raise ValueError('total_tets must be positive')
 
-    # using max_side_length = math.ceil(wanted_blocks ** (1 / 3)) doesn't work because math.ceil sometimes enforces side lengths greater than max_side_lengths
-    for x in range(1, wanted_blocks + 1):
-        yRest = math.ceil(wanted_blocks / x)
-        for y in range(x, yRest + 1):
-            zRest = math.ceil(yRest / y)
-            for z in range(y, zRest + 1):
-                n = x * y * z * tets_per_block
-                if n == total_tets:
-                    configs.append((x, y, z))
+    divisors = _divisors(wanted_blocks)
+    most_balanced_config = None
 
-    if len(configs) == 0:
-        raise AssertionError("No mesh config found")
+    # x is the smallest side, so x ** 3 <= wanted_blocks, and y the middle one, so y ** 2 <= wanted_blocks / x
+    for x in divisors:
+        if x ** 3 > wanted_blocks:
+            break
 
-    most_balanced_config = configs[-1]
-    balance = abs(max(most_balanced_config) - min(most_balanced_config))
+        rest = wanted_blocks // x
+        for y in divisors:
+            if y * y > rest:
+                break
+            if y < x or rest % y != 0:
+                continue
 
-    for c in configs[-2:-1:-1]:
-        c_balance = abs(max(c) - min(c))
+            c = (x, y, rest // y)
+            if most_balanced_config is None or (c[2] - c[0], c[2]) < (
+                    most_balanced_config[2] - most_balanced_config[0], most_balanced_config[2]):
+                most_balanced_config = c
 
-        if c_balance < balance:
-            most_balanced_config = c
-            balance = c_balance
+    if most_balanced_config is None:
+        raise AssertionError("No mesh config found")
 
     return most_balanced_config
+
+
+# mesh configs of a weak scaling series, every task keeps tets_per_task tets
+def calculate_3d_mesh_series(task_counts: list[int], tets_per_task: int, tets_per_block: int) \
+        -> list[tuple[int, tuple[int, int, int]]]:
+    return list(map(lambda t: (t, calculate_3d_mesh_config(t * tets_per_task, tets_per_block)), task_counts))
+
+
+# <tasks>,<tasks>,... or <first>-<last>, which doubles the task count from first up to last
+def parse_task_counts(text: str) -> list[int]:
+    if '-' in text:
+        first, last = map(lambda t: int(t.strip()), text.split('-', 1))
+        assert 0 < first <= last, f"invalid task range {text}"
+
+        task_counts = []
+        while first <= last:
+            task_counts.append(first)
+            first *= 2
+    else:
+        task_counts = list(map(lambda t: int(t.strip()), text.split(',')))
+
+    assert all(map(lambda t: t > 0, task_counts)), "task counts must be positive"
+
+    return task_counts
+
+
+# arguments for "sweep --zip" that create one suite per entry of the series, meshFile is removed for meshX/Y/Z
+def format_mesh_series_sweep_axes(series: list[tuple[int, tuple[int, int, int]]]) -> str:
+    def axis(field: str, values) -> str:
+        return f"--axis {field}={','.join(map(str, values))}"
+
+    axes = [axis("BenchmarkMetaData.tasks", map(lambda s: s[0], series))]
+    axes += [axis(f, map(lambda s: s[1][i], series)) for i, f in enumerate(["meshX", "meshY", "meshZ"])]
+
+    return "--zip " + " ".join(axes) + " --assignments meshFile="
@@ -0,0 +1,131 @@
+import glob
+import os
+import re
+
+from src.Benchmark import Benchmark, BenchmarkDeclaration, MetricDeclaration, MetricsMeasurement
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# name of the benchmark that exposes the hardware performance counters to plot and compare
+PERFCTR_BENCHMARK = "perfctr"
+
+# short names for the commonly used metrics, the factor converts them into the unit of the short name
+_metric_aliases = {
+    "Memory bandwidth [MBytes/s]": ("mem_bandwidth", 1 / 1000),  # GB/s
+    "DP [MFLOP/s]": ("gflops_dp", 1 / 1000),
+    "SP [MFLOP/s]": ("gflops_sp", 1 / 1000),
+    "Vectorization ratio": ("vectorization_ratio", 1),
+    "Vectorization ratio [%]": ("vectorization_ratio", 1),
+}
+
+_repository_path = os.path.join(os.path.dirname(__file__), '..')
+
+# metrics of different hardware threads that add up, all others are averaged
+_additive_metric_pattern = r"\[(?:MBytes/s|MFLOP/s|MUOPS/s|GBytes|MBytes)\]|volume"
+
+
+# likwid-perfctr runs once per node and writes one file each, %h is replaced by the hostname
+def build_perfctr_output_filename(i: int) -> str:
+    return f"run{i}.%h.perfctr.csv"
+
+
+def find_perfctr_files(target_dir: str, i: int) -> list[str]:
+    return sorted(glob.glob(os.path.join(glob.escape(target_dir), f"run{i}.*.perfctr.csv")))
+
+
+# the wrapper for every rank of an srun step, see perfctr_step.sh
+def build_perfctr_command(groups: list[str], cpu_list: str, pin: bool, output_filepath: str) -> str:
+    wrapper_filepath = os.path.abspath(os.path.join(_repository_path, "perfctr_step.sh"))
+
+    return f'"{wrapper_filepath}" {cpu_list} {"true" if pin else "false"} {",".join(groups)} "{output_filepath}"'
+
+
+def _to_float(text: str) -> float | None:
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+# returns the value of every hardware thread for each metric, prefixed with the group name
+def parse_perfctr_csv(text: str) -> dict[str, dict[str, float]]:
+    metrics: dict[str, dict[str, float]] = {}
+
+    group = None
+    threads: list[str] = []
+    lines = text.splitlines()
+    for line in lines:
+        fields = line.split(',')
+
+        if fields[0] in ("TABLE", "STRUCT"):
+            # only the per thread metric tables are of interest, not the raw counters or statistics
+            is_metric_table = len(fields) > 2 and re.fullmatch(r"Group \d+ Metric", fields[1]) is not None
+            group = fields[2] if is_metric_table else None
+            continue
+
+        if group is None:
+            continue
+
+        if fields[0] == "Metric":
+            threads = fields[1:]
+            continue
+
+        values = {thread: v for thread, v in zip(threads, map(_to_float, fields[1:])) if v is not None}
+        if len(values) > 0:
+            metrics[f"{group}:{fields[0]}"] = values
+
+    return metrics
+
+
+def _sanitize_metric_name(name: str) -> str:
+    sanitized = re.sub(r"[^0-9a-zA-Z]+", "_", name).strip('_').lower()
+
+    return sanitized
+
+
+# combines the metrics of all nodes of a run, returns None if the run has no counter output
+def read_run_perfctr_metrics(target_dir: str, i: int) -> dict[str, float] | None:
+    perfctr_files = find_perfctr_files(target_dir, i)
+    if len(perfctr_files) == 0:
+        return None
+
+    # keyed by the node, i.e. the hostname in the filename, and the hardware thread
+    per_thread_values: dict[str, dict[tuple[str, str], list[float]]] = {}
+    for path in perfctr_files:
+        node = os.path.basename(path)[len(f"run{i}."):-len(".perfctr.csv")]
+
+        with open(path, 'r') as f:
+            for name, values in parse_perfctr_csv(f.read()).items():
+                for thread, value in values.items():
+                    per_thread_values.setdefault(name, {}).setdefault((node, thread), []).append(value)
+
+    metrics = {}
+    for name, thread_values in per_thread_values.items():
+        group, metric = name.split(':', 1)
+        # a hardware thread that was measured more than once still counts once
+        values = list(map(lambda v: sum(v) / len(v), thread_values.values()))
+
+        if re.search(_additive_metric_pattern, metric, re.IGNORECASE) is not None:
+            value = sum(values)
+        else:
+            value = sum(values) / len(values)
+
+        metrics[_sanitize_metric_name(f"{group}_{metric}")] = value
+
+        if metric in _metric_aliases:
+            alias, factor = _metric_aliases[metric]
+            metrics[alias] = value * factor
+
+    return metrics
+
+
+# the counters of a run as a benchmark with a single measurement
+def build_perfctr_benchmark(metrics: dict[str, float]) -> Benchmark:
+    decl = BenchmarkDeclaration(PERFCTR_BENCHMARK, [MetricDeclaration(name, 'float') for name in metrics.keys()])
+    benchmark = Benchmark(decl)
+    benchmark.add_measurement(
+        MetricsMeasurement(PERFCTR_BENCHMARK, 0, [(name, str(value)) for name, value in metrics.items()]))
+
+    return benchmark
@@ -0,0 +1,110 @@
+import heapq
+import os
+
+from src.backends import ExecutionBackend, JobPlan, RunRequest, create_backend
+from src.history import predict_run_duration
+from src.run import RunOptions, target_repetitions
+from src.status import has_run_failed
+from src.store import suite_fingerprint, build_stored_run_log_path
+from src.utils import BenchmarkIterator, load_benchmark_parameters, build_run_log_filename, is_run_log_complete
+
+
+# prints the jobs a run would submit without building, cleaning or submitting anything
+def plan(target_dirs: list[str], options: RunOptions) -> None:
+    env = os.environ.get('BA_BENCHMARKING_UTILITIES_ENV')
+
+    if env is None:
+        raise ValueError("BA_BENCHMARKING_UTILITIES_ENV must be set")
+
+    backend = create_backend(env, options.multicore)
+
+    runs = []
+    suites_without_history = []
+    # the runner executes runs of identical suites only once
+    planned_runs: set[tuple[str, int]] = set()
+    for b in BenchmarkIterator(target_dirs):
+        params = load_benchmark_parameters(b)
+        repetitions = _planned_repetitions(b, params, options)
+
+        fingerprint = suite_fingerprint(params)
+        if options.reuse and fingerprint is not None:
+            repetitions = list(filter(lambda i: (fingerprint, i) not in planned_runs, repetitions))
+            planned_runs.update(map(lambda i: (fingerprint, i), repetitions))
+
+        runs += list(map(lambda i: RunRequest(b, i, params), repetitions))
+
+        if predict_run_duration(params) is None:
+            suites_without_history.append(b)
+
+    print_plan(backend, list(map(backend.plan_job, backend.group(runs))), suites_without_history)
+
+
+# the repetitions the runner would execute, i.e. without the ones that are complete, didn't fail or are in the result store
+def _planned_repetitions(target_dir: str, params: dict[str, dict[str, str]], options: RunOptions) -> list[int]:
+    repetitions = list(range(target_repetitions(target_dir, params, options)))
+
+    if options.failed_only:
+        repetitions = list(filter(lambda i: has_run_failed(target_dir, i), repetitions))
+    elif options.resume:
+        repetitions = list(filter(
+            lambda i: not is_run_log_complete(os.path.join(target_dir, build_run_log_filename(i))),
+            repetitions))
+
+    fingerprint = suite_fingerprint(params)
+    if options.reuse and fingerprint is not None:
+        repetitions = list(filter(
+            lambda i: not is_run_log_complete(build_stored_run_log_path(fingerprint, i)), repetitions))
+
+    return repetitions
+
+
+def print_plan(backend: ExecutionBackend, jobs: list[JobPlan], suites_without_history: list[str]) -> None:
+    print(f"{'job':>5} {'nodes':>6} {'tasks':>6} {'predicted runtime':>18}")
+    for i, j in enumerate(jobs):
+        print(f"{i:>5} {j.nodes:>6} {j.tasks:>6} {_format_duration(j.predicted_duration):>18}")
+
+    predicted_jobs = list(filter(lambda j: j.predicted_duration is not None, jobs))
+    node_hours = sum(map(lambda j: j.nodes * j.predicted_duration, predicted_jobs)) / 3600
+
+    print()
+    print(f"{len(jobs)} jobs, {len(jobs) - len(predicted_jobs)} without runtime history")
+    print(f"predicted node-hours: {node_hours:.2f}")
+    print(f"predicted makespan: {_format_duration(_makespan(predicted_jobs, backend.capacity()))}")
+
+    if len(suites_without_history) > 0:
+        print()
+        print("suites without runtime history:")
+        for s in suites_without_history:
+            print(f"  {s}")
+
+
+# longest jobs first, every job starts as soon as enough capacity is free
+def _makespan(jobs: list[JobPlan], capacity: int) -> float:
+    running: list[tuple[float, int]] = []
+    free = capacity
+    now = 0.0
+    end = 0.0
+
+    for j in sorted(jobs, key=lambda j: j.predicted_duration, reverse=True):
+        # oversized jobs run as soon as nothing else runs
+        allocation = min(j.allocation, capacity)
+
+        while free < allocation:
+            now, released = heapq.heappop(running)
+            free += released
+
+        heapq.heappush(running, (now + j.predicted_duration, allocation))
+        free -= allocation
+        end = max(end, now + j.predicted_duration)
+
+    return end
+
+
+def _format_duration(seconds: float | None) -> str:
+    if seconds is None:
+        return "unknown"
+
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
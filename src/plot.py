@@ -1,3 +1,5 @@
+import itertools
+import math
 import operator
 import os
 from functools import reduce
@@ -5,13 +7,16 @@ from functools import reduce
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 from matplotlib.lines import Line2D
+from matplotlib.ticker import MaxNLocator
 from enum import Enum
 
 from matplotlib.figure import Figure
 
 from src.extract import extract_benchmarks, restrict_benchmarks
-from src.utils import Graph, list_flatten, build_std_plot_filename, BenchmarkIterator, find_single_prm_file, \
-    load_prm_file, build_run_log_filename
+from src.family import BenchmarkFamily, find_benchmark_families
+from src.Benchmark import Graph, Point2D
+from src.utils import list_flatten, build_std_plot_filename, BenchmarkIterator, find_single_prm_file, \
+    load_prm_file, build_run_log_filename, parse_repeat_spec, count_repetitions
 
 import logging
 
@@ -88,11 +93,9 @@ class Plot:
         axes.set_yscale(self.axis_types[1].value)
         axes.grid(visible=True)
 
-        colors = iter(mcolors.TABLEAU_COLORS.keys())
-        markers = iter(
-            Line2D.markers.keys())
-        next(markers)
-        next(markers)  # skip plain pixel
+        # plots with more graphs than colors reuse them
+        colors = itertools.cycle(mcolors.TABLEAU_COLORS.keys())
+        markers = itertools.cycle(list(Line2D.markers.keys())[2:])  # skip plain pixel
 
         for graph in self.graphs:
             xpoints = []
@@ -137,6 +140,8 @@ axes.plot(xpoints, ypoints{label}, marker=next(markers), color=next(colors))"""
             add_graphs_snippet += add_graphs_template.format(xpoints=xpoints, ypoints=ypoints, label=label) + '\n'
 
         template = """
+import itertools
+
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 from matplotlib.lines import Line2D
@@ -152,10 +157,8 @@ axes.set_xscale("{xscale}")
 axes.set_yscale("{yscale}")
 axes.grid(visible=True)
 
-colors = iter(mcolors.TABLEAU_COLORS.keys())
-markers = iter(Line2D.markers.keys())
-next(markers)
-next(markers)  # skip plain pixel
+colors = itertools.cycle(mcolors.TABLEAU_COLORS.keys())
+markers = itertools.cycle(list(Line2D.markers.keys())[2:])  # skip plain pixel
 
 {add_graphs}
 
@@ -177,6 +180,146 @@ plot.savefig("{output_filepath}")"""
                                plot_legend=plot_legend, output_filepath=output_filepath)
 
 
+# the values of a metric over the outer and inner iterations of a benchmark family
+class HeatmapPlot:
+    title: str
+    metric: str
+    # values[outer][inner]
+    values: list[list[float | None]]
+
+    _plt: Figure | None
+
+    def __init__(self, values: list[list[float | None]], title: str, metric: str):
+        if len(values) == 0:
+            raise ValueError(f"heatmap {title} got no values")
+
+        self.values = values
+        self.title = title
+        self.metric = metric
+
+        self._plt = None
+
+    def save_and_close(self, filepath: str):
+        if self._plt is None:
+            self._plt = self._create_plot()
+
+        self._plt.savefig(filepath)
+        plt.close(self._plt)
+
+    # residuals span many orders of magnitude, so positive values are colored logarithmically
+    def _is_logarithmic(self) -> bool:
+        return all(map(lambda v: v is None or v > 0, list_flatten(self.values)))
+
+    def _create_plot(self) -> Figure:
+        plot = plt.figure()
+
+        axes = plot.add_subplot()
+
+        axes.set_title(self.title)
+        axes.set_xlabel("inner iteration")
+        axes.set_ylabel("outer iteration")
+
+        # missing inner iterations stay blank
+        data = [[math.nan if v is None else v for v in row] for row in self.values]
+        norm = mcolors.LogNorm() if self._is_logarithmic() else None
+
+        image = axes.imshow(data, aspect='auto', origin='lower', interpolation='nearest', norm=norm)
+        plot.colorbar(image, ax=axes, label=self.metric)
+        axes.xaxis.set_major_locator(MaxNLocator(integer=True))
+        axes.yaxis.set_major_locator(MaxNLocator(integer=True))
+
+        return plot
+
+    def create_plot_script(self, output_filepath: str) -> str:
+        template = """
+import math
+
+import matplotlib.pyplot as plt
+import matplotlib.colors as mcolors
+from matplotlib.ticker import MaxNLocator
+
+nan = math.nan
+
+plot = plt.figure()
+
+axes = plot.add_subplot()
+
+axes.set_title("{title}")
+axes.set_xlabel("inner iteration")
+axes.set_ylabel("outer iteration")
+
+data = {data}
+
+image = axes.imshow(data, aspect='auto', origin='lower', interpolation='nearest', norm={norm})
+plot.colorbar(image, ax=axes, label="{metric}")
+axes.xaxis.set_major_locator(MaxNLocator(integer=True))
+axes.yaxis.set_major_locator(MaxNLocator(integer=True))
+
+plot.savefig("{output_filepath}")"""
+        data = [[math.nan if v is None else v for v in row] for row in self.values]
+        norm = "mcolors.LogNorm()" if self._is_logarithmic() else "None"
+
+        return template.format(title=self.title, data=data, norm=norm, metric=self.metric,
+                               output_filepath=output_filepath)
+
+
+def _write_plot(plot: Plot | HeatmapPlot, output_filepath: str, format: str) -> None:
+    if format == 'std':
+        plot.save_and_close(output_filepath)
+    elif format == 'script':
+        script = plot.create_plot_script(output_filepath)
+        with open(output_filepath + '.py', 'w') as f:
+            f.write(script)
+
+
+# the total of every wanted metric and the amount of inner iterations per outer iteration
+def _build_inner_work_plot(family: BenchmarkFamily, wanted_metrics: list[str] | None, title: str) -> Plot:
+    graphs = [Graph("inner iterations", [Point2D(i, n) for i, n in enumerate(family.inner_iterations())])]
+
+    if wanted_metrics is not None:
+        for metric in filter(lambda m: m in family.metrics, wanted_metrics):
+            totals = family.inner_totals(metric)
+            graphs.append(Graph(f"total {metric}", [Point2D(i, t) for i, t in enumerate(totals)]))
+
+    return Plot(graphs, title, "inner work", "outer iteration")
+
+
+# plots benchmark families like NG_inner_mg_0..N as one heatmap per metric or as their inner work per outer iteration
+def family_plot(target_dir: str, kind: str, wanted_families: list[str] | None, wanted_metrics: list[str] | None,
+                format: str = 'std'):
+    assert kind in ['heatmap', 'inner-work'], f"unknown family plot kind {kind}"
+
+    for benchmark_dir in BenchmarkIterator(target_dir):
+        # restricting the benchmarks would drop the iterations without a wanted metric from the inner iterations
+        families = find_benchmark_families(extract_benchmarks(benchmark_dir, wanted_metrics))
+        if wanted_metrics is not None:
+            for family in families:
+                family.metrics = list(filter(lambda m: m in wanted_metrics, family.metrics))
+
+        if wanted_families is not None:
+            families = list(filter(lambda f: f.name in wanted_families, families))
+
+        if len(families) == 0:
+            _logger.error(f"{benchmark_dir} has no benchmark families to plot")
+            continue
+
+        for family in families:
+            # inner-work plots still show the inner iterations of families without metrics, unless some were wanted
+            if len(family.metrics) == 0 and (kind == 'heatmap' or wanted_metrics is not None):
+                _logger.error(f"{family.name} of {benchmark_dir} has none of the wanted metrics")
+                continue
+
+            if kind == 'heatmap':
+                for metric in family.metrics:
+                    output_filename = f"{family.name}.{metric}.heatmap.pdf"
+                    plot = HeatmapPlot(family.values[metric], output_filename, metric)
+                    _write_plot(plot, os.path.join(benchmark_dir, 'matplots', output_filename), format)
+            else:
+                output_filename = f"{family.name}.inner-work.pdf"
+                plot = _build_inner_work_plot(family, wanted_metrics, output_filename)
+                _write_plot(plot, os.path.join(benchmark_dir, 'matplots', output_filename), format)
+
+
 # todo output writing has code duplication
 def std_plot(target_dir: str, wanted_benchmarks: list[str] | None, wanted_metrics: list[str] | None,
              show: bool = False, format: str = 'std'):
@@ -187,9 +330,9 @@ def std_plot(target_dir: str, wanted_benchmarks: list[str] | None, wanted_metric
         if "BenchmarkMetaData" not in prm or "repeat" not in prm["BenchmarkMetaData"]:
             raise ValueError(f"config of {benchmark_dir} does not contain a repeat value")
 
-        repetitions_amount = int(prm["BenchmarkMetaData"]["repeat"])
+        repetitions_amount = count_repetitions(benchmark_dir, parse_repeat_spec(prm["BenchmarkMetaData"]["repeat"]))
 
-        for i in range(repetitions_amount):
+        for i in range(max(1, repetitions_amount)):
             run_log_path = os.path.join(benchmark_dir, build_run_log_filename(i))
             if not os.path.isfile(run_log_path):
                 _logger.error(
@@ -197,7 +340,7 @@ def std_plot(target_dir: str, wanted_benchmarks: list[str] | None, wanted_metric
 
                 return
 
-        benchmarks = extract_benchmarks(benchmark_dir)
+        benchmarks = extract_benchmarks(benchmark_dir, wanted_metrics)
         benchmarks = restrict_benchmarks(benchmarks, wanted_benchmarks, wanted_metrics)
 
         ylabel = 'all'
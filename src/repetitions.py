@@ -0,0 +1,76 @@
+import math
+import os
+import statistics
+
+from src.extract import extract_run_log
+from src.utils import RepeatSpec, build_run_log_filename, is_run_log_complete
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# two-sided 95% quantiles of the t-distribution for 1 to 30 degrees of freedom
+_t_quantiles = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+def relative_confidence_interval(values: list[float]) -> float:
+    if len(values) < 2:
+        return math.inf
+
+    mean = statistics.fmean(values)
+    if mean == 0:
+        return math.inf
+
+    degrees_of_freedom = len(values) - 1
+    t = _t_quantiles[degrees_of_freedom - 1] if degrees_of_freedom <= len(_t_quantiles) else 1.96
+
+    half_width = t * statistics.stdev(values) / math.sqrt(len(values))
+
+    return abs(half_width / mean)
+
+
+# the metric summed over all measurements of the benchmark, which is the first benchmark containing the metric by default
+def _run_metric_total(run_log_path: str, spec: RepeatSpec) -> float:
+    benchmarks = extract_run_log(run_log_path)
+
+    for b in benchmarks:
+        if spec.benchmark is not None and b.decl.name != spec.benchmark:
+            continue
+        if not any(map(lambda m: m.name == spec.metric, b.decl.metrics)):
+            continue
+
+        return sum(float(value) for m in b.measurements for name, value in m.values if name == spec.metric)
+
+    raise ValueError(f"{run_log_path} has no benchmark with the metric {spec.metric} for adaptive repetitions")
+
+
+# total amount of repetitions an adaptive suite needs according to its complete runs
+def needed_repetitions(target_dir: str, spec: RepeatSpec) -> int:
+    complete_runs = 0
+    while complete_runs < spec.max and is_run_log_complete(
+            os.path.join(target_dir, build_run_log_filename(complete_runs))):
+        complete_runs += 1
+
+    if complete_runs < spec.min:
+        return spec.min
+
+    if complete_runs >= spec.max:
+        return complete_runs
+
+    values = [_run_metric_total(os.path.join(target_dir, build_run_log_filename(i)), spec)
+              for i in range(complete_runs)]
+    rel_ci = relative_confidence_interval(values)
+
+    if rel_ci <= spec.rel_ci:
+        _logger.info(f"{target_dir} converged after {complete_runs} runs, relative confidence interval {rel_ci:.4f}")
+        return complete_runs
+
+    # the interval shrinks with the square root of the amount of runs
+    estimate = math.ceil(complete_runs * (rel_ci / spec.rel_ci) ** 2)
+    needed = min(spec.max, max(complete_runs + 1, estimate))
+    _logger.info(f"{target_dir} has a relative confidence interval of {rel_ci:.4f} after {complete_runs} runs, "
+                 f"scheduling up to {needed} runs")
+
+    return needed
@@ -1,14 +1,18 @@
-import math
 import os
-import re
-import subprocess
 import time
-from functools import reduce
-from subprocess import Popen
+from dataclasses import dataclass, field
 
+from src.accounting import write_run_usage, build_run_usage_filename
+from src.backends import ExecutionBackend, BenchmarkJob, RunRequest, create_backend
+from src.build import ProjectBuilder
 from src.config import prep_fresh_directory
-from src.utils import find_single_prm_file, BenchmarkIterator, clean_benchmark_suite, \
-    build_run_log_filename, load_benchmark_parameters
+from src.perfctr import find_perfctr_files
+from src.repetitions import needed_repetitions
+from src.status import build_run_status_filename, build_run_stderr_filename, has_run_failed
+from src.store import suite_fingerprint, reuse_stored_run_log, publish_run_log
+from src.utils import BenchmarkIterator, clean_benchmark_suite, build_run_log_filename, load_benchmark_parameters, \
+    is_run_log_complete, parse_repeat_spec, count_repetitions
+from src.watchdog import StallPolicy, build_run_failures_filename
 
 import datetime
 import logging
@@ -16,61 +20,20 @@ import logging
 _logger = logging.getLogger(__name__)
 
 
-class BenchmarkJob:
-    tasks: int
-    name: str
+@dataclass
+class RunOptions:
+    multicore: bool = False
+    make_jobs: int = os.cpu_count() or 1
+    resume: bool = False
+    reuse: bool = True
+    # keep running until backends like slurm, whose jobs outlive the runner, finished all jobs
+    wait: bool = False
+    # only rerun repetitions whose status reports a failure
+    failed_only: bool = False
+    stall_policy: StallPolicy = field(default_factory=StallPolicy)
 
-    def poll(self) -> bool:
-        return False
 
-    def wait(self) -> None:
-        return None
-
-    def kill(self) -> None:
-        return None
-
-
-class LaptopJob(BenchmarkJob):
-    _subprocess: Popen
-
-    def __init__(self, name: str, tasks: int, subprocess: Popen):
-        self.name = name
-        self.tasks = tasks
-        self._subprocess = subprocess
-
-    def poll(self) -> bool:
-        return self._subprocess.poll() is not None
-
-    def wait(self) -> None:
-        self._subprocess.wait()
-
-        return None
-
-    def kill(self) -> None:
-        self._subprocess.kill()
-
-
-class FritzJob(BenchmarkJob):
-    _job_id: str
-
-    def __init__(self, name: str, tasks: int, _job_id: str):
-        self.name = name
-        self.tasks = tasks
-        self._job_id = _job_id
-
-    def poll(self) -> bool:
-        return _is_slurm_job_finished(self._job_id)
-
-    def wait(self) -> None:
-        _wait_until_slurm_job_finished(self._job_id)
-
-        return None
-
-    def kill(self) -> None:
-        _cancel_slurm_job(self._job_id)
-
-
-def run(target_dirs: list[str], multicore: bool):
+def run(target_dirs: list[str], options: RunOptions):
     date = datetime.datetime.now()
     log_name = date.strftime("%Y-%m-%d_%Hh-%Mm-%Ss")
     log_path = os.path.join("benchmarks", "logs", log_name + ".log")
@@ -81,299 +44,257 @@ def run(target_dirs: list[str], multicore: bool):
 
     if env is None:
         raise ValueError("BA_BENCHMARKING_UTILITIES_ENV must be set")
-    elif env == "laptop":
-        run_on_laptop(target_dirs, multicore)
-    elif env == "fritz":
-        _run_on_slurm_machine(target_dirs, multicore)
-    else:
-        raise ValueError("invalid BA_BENCHMARKING_UTILITIES_ENV value " + env)
-
-
-def run_on_laptop(target_dirs: list[str], multicore: bool):
-    benchmark_iter = BenchmarkIterator(target_dirs)
-
-    active_jobs: list[BenchmarkJob] = []
-    built_folders = []
-
-    try:
-        for b in benchmark_iter:
-            bm_params = load_benchmark_parameters(b)["BenchmarkMetaData"]
-            binary_path = bm_params['binary']
-            tasks = int(bm_params['tasks'])
-            repeat = int(bm_params['repeat'])
 
-            binary_folder = os.path.dirname(binary_path)
+    backend = create_backend(env, options.multicore)
+    backend.stall_policy = options.stall_policy
+    _run_with_backend(backend, target_dirs, options)
 
-            if binary_folder not in built_folders:
-                _build_project(binary_folder)
-                built_folders.append(binary_folder)
 
-            prep_fresh_directory(b)
-            clean_benchmark_suite(b)
+class _JobScheduler:
+    backend: ExecutionBackend
+    active_jobs: list[BenchmarkJob]
 
-            for i in range(repeat):
-                if multicore:
-                    raise ValueError("multicore processing not implemented yet on laptop")
+    _poll_interval: float
+    # runs of this invocation that haven't finished yet, keyed by suite fingerprint and repetition
+    _unfinished_runs: dict[tuple[str, int], RunRequest]
 
-                    allowed_total_jobs = 6  # todo
+    def __init__(self, backend: ExecutionBackend):
+        self.backend = backend
+        self.active_jobs = []
+        self._poll_interval = 0.1
+        self._unfinished_runs = {}
 
-                    # todo rearranging remaining jobs might improve performance
-                    #   e.g. if small and big jobs are mixed, performance is waisted
-                    #   a simple idea would be to sort jobs by size
-                    wait_duration = 1
-                    while _waiting_update_and_check_is_busy(allowed_total_jobs, active_jobs, tasks, wait_duration):
-                        wait_duration = min(600, wait_duration * 2)
+    # returns the runs that have to be executed, runs of identical suites are only executed once
+    # and get the run log linked when it finished
+    def deduplicate(self, runs: list[RunRequest]) -> list[RunRequest]:
+        unique_runs = []
 
-                else:
-                    for j in active_jobs:
-                        j.wait()
+        for r in runs:
+            fingerprint = suite_fingerprint(r.params)
+            if fingerprint is None:
+                unique_runs.append(r)
+                continue
 
-                job = _exec_on_laptop(b, f"{build_run_log_filename(i)}")
-                _logger.info(f"started job " + job.name)
-                active_jobs.append(job)
+            key = (fingerprint, r.repetition)
+            if key in self._unfinished_runs:
+                self._unfinished_runs[key].duplicate_dirs.append(r.target_dir)
+                _logger.info(f"run {r.repetition} of {r.target_dir} duplicates the one of "
+                             f"{self._unfinished_runs[key].target_dir}")
+                continue
 
-        for j in active_jobs:
-            j.wait()
+            self._unfinished_runs[key] = r
+            unique_runs.append(r)
 
-    except KeyboardInterrupt:
-        _logger.info("canceled benchmarks")
-
-    for j in active_jobs:
-        j.kill()
-
-
-def _run_on_slurm_machine(target_dirs: list[str], multicore: bool):
-    benchmark_iter = BenchmarkIterator(target_dirs)
-    tasks_per_node = 72
-    max_node_amount = 32
-
-    built_folders = []
-    chunks: dict[int, list[tuple[str, str]]] = {}
+        return unique_runs
 
-    # partition into chunks with same tasks amount
-    for b in benchmark_iter:
-        params = load_benchmark_parameters(b)
-        tasks = int(params['BenchmarkMetaData']['tasks'])
-        repeat = int(params['BenchmarkMetaData']['repeat'])
-
-        # todo building and cleaning should be outside partitioning
-        #   these things should be outsourced and merged from laptop and slurm execution
-        # build all binaries alongside partitioning
-        binary_path = params['BenchmarkMetaData']['binary']
-        binary_folder = os.path.dirname(binary_path)
-
-        if binary_folder not in built_folders:
-            _build_project(binary_folder)
-            built_folders.append(binary_folder)
-
-        # and clean the benchmark directory
-        prep_fresh_directory(b)
-        clean_benchmark_suite(b)
-
-        if tasks not in chunks:
-            chunks[tasks] = []
-
-        for i in range(repeat):
-            chunks[tasks].append((b, build_run_log_filename(i)))
+    def submit(self, runs: list[RunRequest]) -> None:
+        # usual waiting with exponentially increasing wait duration, capped by the backend
+        while not self.backend.has_capacity(self.active_jobs, runs):
+            self._wait_for_progress()
 
-    demanded_nodes = sum(map(lambda t: math.ceil(t / tasks_per_node), chunks.keys()))
-    free_nodes = max_node_amount - demanded_nodes
+        job = self.backend.submit(runs)
+        _logger.info(f"started job " + job.name)
+        self.active_jobs.append(job)
 
-    assert free_nodes > 0, "todo: implement load balancing on slurm machines"
+    # takes over jobs of an earlier runner and processes the ones that finished
+    def adopt(self, jobs: list[BenchmarkJob]) -> None:
+        self.active_jobs += jobs
+        self._update()
 
-    if tasks_per_node in chunks:
-        single_node_chunks = chunks[tasks_per_node]
-        # spread single node chunks across remaining nodes
-        chunk_size = len(single_node_chunks) // (free_nodes + 1)
-        remainder = len(single_node_chunks) % (free_nodes + 1)
-        pointer = chunk_size
+    def wait_all(self) -> None:
+        while len(self.active_jobs) > 0:
+            self._wait_for_progress()
 
-        if remainder > 0:
-            pointer += 1
-        partition = [single_node_chunks[:pointer]]
+    def cancel_all(self) -> None:
+        for j in self.active_jobs:
+            self.backend.cancel(j)
 
-        for i in range(1, free_nodes):
-            old_pointer = pointer
-            pointer += chunk_size
-            if remainder > i:
-                pointer += 1
+        self.active_jobs = []
 
-            partition.append(single_node_chunks[old_pointer:pointer])
+    def _wait_for_progress(self) -> None:
+        if self._update():
+            self._poll_interval = 0.1
+            return
 
-        partition.append(single_node_chunks[pointer:])
+        time.sleep(self._poll_interval)
+        self._poll_interval = min(self.backend.max_poll_interval, self._poll_interval * 2)
 
-        assert len(partition) == free_nodes + 1
-        assert sum(map(lambda c: len(c), partition)) == len(single_node_chunks)
+    # returns whether any job finished
+    def _update(self) -> bool:
+        finished_jobs = self.backend.poll_many(self.active_jobs)
 
-        del chunks[tasks_per_node]
-
-        total_chunks = list(chunks.values()) + partition
-    else:
-        total_chunks = list(chunks.values())
-
-    enumerated_chunks = enumerate(total_chunks)
-
-    for chunk_id, chunk in enumerated_chunks:
-        _exec_chunk_on_fritz(chunk, chunk_id)
-
-
-def _waiting_update_and_check_is_busy(task_limit: int, active_jobs: list[BenchmarkJob], needed_tasks: int,
-                                      wait_duration: int) -> bool:
-    # update active jobs
-    for j in active_jobs:
-        if j.poll():
-            active_jobs.remove(j)
+        for j in finished_jobs:
+            self.active_jobs.remove(j)
             _logger.info(f"finished job {j.name}")
+            _on_job_finished(self.backend, j)
 
-    active_tasks = sum(map(lambda j: j.tasks, active_jobs))
+            # later duplicates of these runs are taken from the result store instead
+            self._unfinished_runs = {k: r for k, r in self._unfinished_runs.items() if r not in j.runs}
 
-    if active_tasks + needed_tasks <= task_limit:
-        return False
+        return len(finished_jobs) > 0
 
-    time.sleep(wait_duration)
-    return True
 
+def _on_job_finished(backend: ExecutionBackend, job: BenchmarkJob) -> None:
+    for i, usage in backend.accounting(job).items():
+        r = job.runs[i]
+        # the suite might have been cleaned by another runner in the meantime
+        if os.path.isdir(r.target_dir):
+            write_run_usage(r.target_dir, r.repetition, usage)
 
-def _build_project(bin_folder: str) -> None:
-    cwd = os.getcwd()
+    # only complete run logs end up in the store, so failed runs are skipped here
+    for r in job.runs:
+        fingerprint = suite_fingerprint(r.params)
+        if fingerprint is not None:
+            publish_run_log(fingerprint, r.target_dir, r.repetition)
 
-    os.chdir(bin_folder)
+        for d in filter(os.path.isdir, r.duplicate_dirs):
+            if fingerprint is None or not reuse_stored_run_log(fingerprint, d, r.repetition):
+                print(f"run {r.repetition} of {d} is missing since the same run of {r.target_dir} failed, "
+                      f"rerun it with --resume")
+                _logger.warning(f"run {r.repetition} of {d} is missing since the same run of {r.target_dir} failed")
 
-    print(f"compiling {bin_folder}")
-    _logger.info(f"compiling {bin_folder}")
-    subprocess.call(['make'])
 
-    os.chdir(cwd)
+def _run_with_backend(backend: ExecutionBackend, target_dirs: list[str], options: RunOptions):
+    # suites are prepared while the rest of the tree is still being discovered
+    suites = map(lambda b: (b, load_benchmark_parameters(b)), BenchmarkIterator(target_dirs))
 
+    scheduler = _JobScheduler(backend)
+    waiting = backend.waits_for_jobs or options.wait
 
-def _exec_on_laptop(target_dir: str,
-                    output_name: str = build_run_log_filename(0)) -> LaptopJob:
-    param_file_path = find_single_prm_file(target_dir)
-    params = load_benchmark_parameters(target_dir)
-    binary_path = params["BenchmarkMetaData"]["binary"]
-    tasks = int(params["BenchmarkMetaData"]["tasks"])
+    # jobs of earlier runners have to be processed before their suites get cleaned
+    scheduler.adopt(backend.restore_detached_jobs())
 
-    output_filepath = os.path.join(target_dir, output_name)
-    jobscript_filepath = os.path.join(os.path.dirname(__file__), '..', "job_laptop.sh")
+    try:
+        attempted_repetitions: dict[str, int] = {}
+        collected_runs: list[RunRequest] = []
+        adaptive_suites: list[tuple[str, dict[str, dict[str, str]]]] = []
 
-    # todo is this automatically running?
-    job = Popen([jobscript_filepath, binary_path, param_file_path, output_filepath,
-                 str(tasks)])
+        with ProjectBuilder(options.make_jobs) as builder:
+            # suites start as soon as their binary is built, other binaries may still be compiling
+            for b, params in builder.when_built(suites, lambda s: [s[1]["BenchmarkMetaData"]["binary"]]):
+                runs = list(map(lambda i: RunRequest(b, i, params), _prepare_suite(b, params, options)))
+                if options.reuse:
+                    runs = scheduler.deduplicate(runs)
+                attempted_repetitions[b] = target_repetitions(b, params, options)
 
-    # subprocess.call(
-    #     [jobscript_filepath, binary_path, param_file_path, output_filepath,
-    #      str(tasks)])
+                if parse_repeat_spec(params["BenchmarkMetaData"]["repeat"]).is_adaptive():
+                    adaptive_suites.append((b, params))
 
-    return LaptopJob(output_filepath, tasks, job)
+                # backends that bundle runs of several suites need all of them at once
+                if backend.groups_across_suites:
+                    collected_runs += runs
+                    continue
 
+                for group in backend.group(runs):
+                    scheduler.submit(group)
 
-def _exec_chunk_on_fritz(jobs: list[tuple[str, str]], chunk_index: int):
-    fritz_cores_per_node = 72
+        for group in backend.group(collected_runs):
+            scheduler.submit(group)
 
-    assert len(jobs) > 0
+        if not waiting:
+            backend.detach_jobs(scheduler.active_jobs)
 
-    enumerated_jobs = enumerate(jobs)
+            if len(adaptive_suites) > 0:
+                print("adaptive suites only got the repetitions known to be needed so far, "
+                      "rerun with --resume after the jobs finished to schedule further ones")
+            return
 
-    param_files = [{}] * len(jobs)
-    for i, j in enumerated_jobs:
-        target_dir, _ = j
-        params = load_benchmark_parameters(target_dir)
+        # adaptive suites get further runs until their timings converge
+        while len(adaptive_suites) > 0:
+            scheduler.wait_all()
 
-        assert "FritzMetaParameters" in params
-        assert "pinThreads" in params["FritzMetaParameters"]
+            unconverged_suites = []
+            for b, params in adaptive_suites:
+                spec = parse_repeat_spec(params["BenchmarkMetaData"]["repeat"])
+                needed = needed_repetitions(b, spec)
 
-        param_files[i] = params
+                if needed <= attempted_repetitions[b]:
+                    continue
 
-    tasks = int(param_files[0]["BenchmarkMetaData"]["tasks"])
-    for p in param_files[1:]:
-        p_tasks = int(p["BenchmarkMetaData"]["tasks"])
-        assert tasks == p_tasks, "multiple task amounts in benchmark chunk found"
+                extra_repetitions = _reuse_stored_runs(b, params, list(range(attempted_repetitions[b], needed)),
+                                                       options)
+                runs = list(map(lambda i: RunRequest(b, i, params), extra_repetitions))
+                if options.reuse:
+                    runs = scheduler.deduplicate(runs)
+                for group in backend.group(runs):
+                    scheduler.submit(group)
 
-    jobscript_template_filepath = os.path.join(os.path.dirname(__file__), '..', "job_fritz.template")
-    nodes = math.ceil(tasks / fritz_cores_per_node)
-    tasks_per_node = min(fritz_cores_per_node, tasks)
+                attempted_repetitions[b] = needed
+                unconverged_suites.append((b, params))
 
-    with open(jobscript_template_filepath) as f:
-        jobscript_template = f.read()
+            adaptive_suites = unconverged_suites
 
-    jobscript = jobscript_template.replace("__NODES__", str(nodes)).replace("__NTASKS_PER_NODE__",
-                                                                            str(tasks_per_node))
+        scheduler.wait_all()
 
-    for i, j in enumerate(jobs):
-        target_dir, output_name = j
-        params = param_files[i]
-        # srun __DEPENDANT_SRUN_FLAGS__ __CPU_FREQUENCY__ --output="$3" __THREAD_PINNING__ "$1" "$2"
+    except KeyboardInterrupt:
+        _logger.info("canceled benchmarks")
 
-        dependant_srun_flags = ""
-        cpu_frequency = ""
-        output_filepath = os.path.abspath(os.path.join(target_dir, output_name))
-        thread_pinning = ""
-        binary_path = params["BenchmarkMetaData"]["binary"]
-        param_file_path = os.path.abspath(find_single_prm_file(target_dir))
+        if waiting:
+            scheduler.cancel_all()
+        else:
+            backend.detach_jobs(scheduler.active_jobs)
 
-        pinThreadsParameter = params["FritzMetaParameters"]["pinThreads"]
 
-        if pinThreadsParameter == "true":
-            thread_pinning = "likwid-pin -q -C N:scatter"
+# amount of repetitions a suite should have, adaptive suites only get more than their minimum when resuming
+def target_repetitions(target_dir: str, params: dict[str, dict[str, str]], options: RunOptions) -> int:
+    spec = parse_repeat_spec(params['BenchmarkMetaData']['repeat'])
 
-        if "frequency" in params["FritzMetaParameters"]:
-            frequency = params["FritzMetaParameters"]["frequency"]
-            cpu_frequency = f"--cpu-freq={frequency}-{frequency}:performance"
+    if not spec.is_adaptive():
+        return spec.max
 
-        if nodes >= 65:
-            dependant_srun_flags = "-p big"
+    # failed runs are among the existing ones
+    if options.failed_only:
+        return count_repetitions(target_dir, spec)
 
-        status_log = f'echo starting benchmark {output_filepath}'
-        srun_line = f'srun {dependant_srun_flags} {cpu_frequency} --output="{output_filepath}" {thread_pinning} "{binary_path}" "{param_file_path}"'
-        jobscript += f'\n{status_log}\n{srun_line}'
+    if not options.resume:
+        return spec.min
 
-    jobscript_filepath = os.path.join("benchmarks", "chunks", f"chunk{chunk_index}_job_fritz.sh")
+    return needed_repetitions(target_dir, spec)
 
-    with open(jobscript_filepath, 'w') as f:
-        f.write(jobscript)
 
-    subprocess.run(
-        ["sbatch", jobscript_filepath],
-        stdout=subprocess.PIPE)
+# prepares the suite directory and returns the repetitions that have to be run
+def _prepare_suite(target_dir: str, params: dict[str, dict[str, str]], options: RunOptions) -> list[int]:
+    prep_fresh_directory(target_dir)
 
-    benchmarks_str = reduce(lambda s, b: f"{s}, {b}", map(lambda j: j[0], jobs))
-    _logger.info(f"submitted chunk {chunk_index}, consisting of benchmarks {benchmarks_str}")
+    repeat = target_repetitions(target_dir, params, options)
 
-    # retrieve the job id to wait for the job's completion
-    # result = result.stdout.decode("utf-8")
-    # pattern = r"Submitted batch job (\d+)"
-    # match = re.search(pattern, result)
-    # jobid = match.group(1)
-    # _logger.info(f"submitted batch job {jobid}")
-    #
-    # return FritzJob(output_filepath, tasks, jobid)
+    if options.resume or options.failed_only:
+        pending_repetitions = []
+        for i in range(repeat):
+            run_log_path = os.path.join(target_dir, build_run_log_filename(i))
 
+            if options.failed_only and not has_run_failed(target_dir, i):
+                continue
 
-def _is_slurm_job_finished(jobid: str) -> bool:
-    result = subprocess.run(["squeue", "-j", jobid], stdout=subprocess.PIPE)
-    result = result.stdout.decode("utf-8")
-    pattern = r"\s*JOBID\s+PARTITION\s+NAME\s+USER\s+ST\s+TIME\s+TIME_LIMIT\s+NODES\s+CPUS\s+NODELIST\(REASON\)\s*\n\s+\S+\s+\S+\s+\S+\s+\S+\s+(\w+)"
-    match = re.search(pattern, result)
+            if not options.failed_only and is_run_log_complete(run_log_path):
+                continue
 
-    # if the job is finished, it isn't displayed in the squeue output
-    if match is None:
-        return True
+            # truncated logs of interrupted runs are rerun from scratch
+            stale_filenames = [build_run_usage_filename(i), build_run_failures_filename(i),
+                               build_run_status_filename(i), build_run_stderr_filename(i)]
+            stale_paths = [run_log_path] + list(map(lambda f: os.path.join(target_dir, f), stale_filenames))
+            for path in stale_paths + find_perfctr_files(target_dir, i):
+                if os.path.isfile(path):
+                    os.unlink(path)
 
-    jobstatus = match.group(1)
+            pending_repetitions.append(i)
 
-    # if it is displayed, only(?) the status CG means it is finished
-    return jobstatus == "CG"
+        _logger.info(f"resuming {target_dir}, rerunning {len(pending_repetitions)} of {repeat} runs")
+    else:
+        clean_benchmark_suite(target_dir)
+        pending_repetitions = list(range(repeat))
 
+    return _reuse_stored_runs(target_dir, params, pending_repetitions, options)
 
-# usual waiting with exponentially increasing wait duration, capped at 10 min
-def _wait_until_slurm_job_finished(jobid: str) -> None:
-    max_duration = 600
 
-    duration = 1
-    while not _is_slurm_job_finished(jobid):
-        time.sleep(duration)
-        duration = min(max_duration, duration * 2)
+# returns the repetitions that couldn't be taken from the result store
+def _reuse_stored_runs(target_dir: str, params: dict[str, dict[str, str]], repetitions: list[int],
+                       options: RunOptions) -> list[int]:
+    if not options.reuse:
+        return repetitions
 
+    fingerprint = suite_fingerprint(params)
+    if fingerprint is None:
+        return repetitions
 
-def _cancel_slurm_job(jobid: str) -> None:
-    subprocess.run(["scancel", jobid], stdout=subprocess.PIPE)
+    return list(filter(lambda i: not reuse_stored_run_log(fingerprint, target_dir, i), repetitions))
@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+
+from src.utils import BenchmarkIterator, load_prm_file
+
+# suites of a scaling study carry a block like
+# ScalingStudy
+# {
+#     name <study>;
+#     mode weak|strong;
+#     baseTasks <smallest task count of the study>;
+#     totalTets <tets of this suite>;
+# }
+# the tasks of a suite are the ones of its BenchmarkMetaData block
+SCALING_STUDY_BLOCK = "ScalingStudy"
+SCALING_MODES = ["weak", "strong"]
+
+
+@dataclass
+class ScalingPoint:
+    target_dir: str
+    study: str
+    mode: str
+    tasks: int
+    base_tasks: int
+    total_tets: int
+
+
+def build_scaling_study_block(study: str, mode: str, base_tasks: int, total_tets: int) -> dict[str, str]:
+    assert mode in SCALING_MODES, f"scaling mode must be one of {', '.join(SCALING_MODES)}"
+
+    return {
+        "name": study,
+        "mode": mode,
+        "baseTasks": str(base_tasks),
+        "totalTets": str(total_tets),
+    }
+
+
+# None if the suite isn't part of a scaling study
+def read_scaling_point(target_dir: str, prm: dict[str, dict[str, str]]) -> ScalingPoint | None:
+    if SCALING_STUDY_BLOCK not in prm:
+        return None
+
+    block = prm[SCALING_STUDY_BLOCK]
+    for field in ["name", "mode", "baseTasks", "totalTets"]:
+        assert field in block, f"{SCALING_STUDY_BLOCK} block of {target_dir} misses {field}"
+
+    return ScalingPoint(target_dir, block["name"], block["mode"], int(prm["BenchmarkMetaData"]["tasks"]),
+                        int(block["baseTasks"]), int(block["totalTets"]))
+
+
+# maps the study names to their points, sorted by task count
+def find_scaling_studies(target_dirs: list[str]) -> dict[str, list[ScalingPoint]]:
+    studies: dict[str, list[ScalingPoint]] = {}
+
+    for b in BenchmarkIterator(target_dirs):
+        point = read_scaling_point(b, load_prm_file(b))
+
+        if point is not None:
+            studies.setdefault(point.study, []).append(point)
+
+    for name, points in studies.items():
+        assert len(set(map(lambda p: p.mode, points))) == 1, f"the suites of the scaling study {name} mix modes"
+        points.sort(key=lambda p: p.tasks)
+
+    return studies
+
+
+# speedup and parallel efficiency of every point relative to the smallest task count with a time, None without a time.
+# weak studies keep the work per task, so their efficiency is the ratio of the times and the speedup is scaled up
+# by the amount of tasks, strong studies keep the total work
+def compute_speedups(points: list[ScalingPoint], times: list[float | None]) \
+        -> list[tuple[float | None, float | None]]:
+    measured = [(p, t) for p, t in zip(points, times) if t is not None and t > 0]
+    if len(measured) == 0:
+        return [(None, None)] * len(points)
+
+    reference, reference_time = measured[0]
+
+    speedups = []
+    for p, t in zip(points, times):
+        if t is None or t <= 0:
+            speedups.append((None, None))
+        elif p.mode == "weak":
+            efficiency = reference_time / t
+            speedups.append((efficiency * p.tasks / reference.tasks, efficiency))
+        else:
+            speedup = reference_time / t
+            speedups.append((speedup, speedup * reference.tasks / p.tasks))
+
+    return speedups
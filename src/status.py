@@ -0,0 +1,72 @@
+import os
+from dataclasses import dataclass
+
+# the job scripts write runN.status after every run:
+# exit_code=<code>
+# signal=<signal>  (only if the run was killed by a signal)
+# stderr_tail:
+# <last lines of stderr>
+
+# exit code of runs that the watchdog gave up on, like the one of coreutils timeout
+STALLED_EXIT_CODE = 124
+
+
+@dataclass
+class RunStatus:
+    exit_code: int
+    signal: int | None
+    stderr_tail: str
+
+    def failed(self) -> bool:
+        return self.exit_code != 0
+
+    def describe(self) -> str:
+        if self.signal is not None:
+            return f"killed by signal {self.signal}"
+
+        if self.exit_code == STALLED_EXIT_CODE:
+            return "stalled"
+
+        return f"exit code {self.exit_code}"
+
+
+def build_run_status_filename(i: int) -> str:
+    return f"run{i}.status"
+
+
+def build_run_stderr_filename(i: int) -> str:
+    return f"run{i}.stderr"
+
+
+def write_run_status(status_path: str, status: RunStatus) -> None:
+    with open(status_path, 'w') as f:
+        f.write(f"exit_code={status.exit_code}\n")
+        if status.signal is not None:
+            f.write(f"signal={status.signal}\n")
+        f.write("stderr_tail:\n")
+        f.write(status.stderr_tail)
+
+
+def read_run_status(target_dir: str, i: int) -> RunStatus | None:
+    status_path = os.path.join(target_dir, build_run_status_filename(i))
+
+    if not os.path.isfile(status_path):
+        return None
+
+    with open(status_path, 'r') as f:
+        text = f.read()
+
+    header, _, stderr_tail = text.partition("stderr_tail:\n")
+
+    fields = dict(line.split('=', 1) for line in header.splitlines() if '=' in line)
+    assert "exit_code" in fields, f"{status_path} has no exit code"
+
+    signal = int(fields["signal"]) if "signal" in fields else None
+
+    return RunStatus(int(fields["exit_code"]), signal, stderr_tail)
+
+
+def has_run_failed(target_dir: str, i: int) -> bool:
+    status = read_run_status(target_dir, i)
+
+    return status is not None and status.failed()
@@ -0,0 +1,119 @@
+import copy
+import hashlib
+import json
+import os
+import shutil
+
+from src.accounting import build_run_usage_filename
+from src.scaling import SCALING_STUDY_BLOCK
+from src.utils import build_run_log_filename, is_run_log_complete
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# fields that don't influence the outcome of a single run
+_ignored_fields = {
+    "BenchmarkMetaData": ["repeat", "reduce"],
+    "Parameters": ["vtk_output"],
+}
+
+# blocks that only group suites, e.g. into scaling studies
+_ignored_blocks = [SCALING_STUDY_BLOCK]
+
+_binary_hashes: dict[tuple[str, float], str] = {}
+
+
+def get_store_path() -> str:
+    return os.path.abspath(os.path.join("benchmarks", "store"))
+
+
+def _hash_file(path: str) -> str:
+    # binaries are hashed once per modification
+    key = (path, os.path.getmtime(path))
+
+    if key not in _binary_hashes:
+        file_hash = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                file_hash.update(block)
+
+        _binary_hashes[key] = file_hash.hexdigest()
+
+    return _binary_hashes[key]
+
+
+# identifies suites whose runs are interchangeable, None if the binary doesn't exist
+def suite_fingerprint(params: dict[str, dict[str, str]]) -> str | None:
+    normalized = copy.deepcopy(params)
+
+    for block in _ignored_blocks:
+        normalized.pop(block, None)
+
+    for block, fields in _ignored_fields.items():
+        for field in fields:
+            normalized.get(block, {}).pop(field, None)
+
+    binary_path = normalized["BenchmarkMetaData"]["binary"]
+    if not os.path.isfile(binary_path):
+        return None
+
+    normalized["BenchmarkMetaData"]["binary"] = _hash_file(binary_path)
+
+    text = json.dumps(normalized, sort_keys=True)
+
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def build_stored_run_log_path(fingerprint: str, i: int) -> str:
+    return os.path.join(get_store_path(), fingerprint, build_run_log_filename(i))
+
+
+def build_stored_run_usage_path(fingerprint: str, i: int) -> str:
+    return os.path.join(get_store_path(), fingerprint, build_run_usage_filename(i))
+
+
+def _link_or_copy(source: str, destination: str) -> None:
+    tmp_path = destination + '.tmp'
+
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        # hard links don't work across file systems
+        shutil.copyfile(source, tmp_path)
+
+    os.replace(tmp_path, destination)
+
+
+# links the stored run log into the suite, returns whether there was a reusable run log
+def reuse_stored_run_log(fingerprint: str, target_dir: str, i: int) -> bool:
+    stored_path = build_stored_run_log_path(fingerprint, i)
+
+    if not is_run_log_complete(stored_path):
+        return False
+
+    _link_or_copy(stored_path, os.path.join(target_dir, build_run_log_filename(i)))
+
+    stored_usage_path = build_stored_run_usage_path(fingerprint, i)
+    if os.path.isfile(stored_usage_path):
+        _link_or_copy(stored_usage_path, os.path.join(target_dir, build_run_usage_filename(i)))
+
+    _logger.info(f"reused {stored_path} for run {i} of {target_dir}")
+
+    return True
+
+
+def publish_run_log(fingerprint: str, target_dir: str, i: int) -> None:
+    run_log_path = os.path.join(target_dir, build_run_log_filename(i))
+
+    if not is_run_log_complete(run_log_path):
+        return
+
+    stored_path = build_stored_run_log_path(fingerprint, i)
+    os.makedirs(os.path.dirname(stored_path), exist_ok=True)
+
+    _link_or_copy(run_log_path, stored_path)
+
+    usage_path = os.path.join(target_dir, build_run_usage_filename(i))
+    if os.path.isfile(usage_path):
+        _link_or_copy(usage_path, build_stored_run_usage_path(fingerprint, i))
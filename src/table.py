@@ -0,0 +1,297 @@
+import csv
+import io
+import os
+import sys
+from dataclasses import dataclass
+
+from src.extract import extract_benchmarks
+from src.scaling import compute_speedups, find_scaling_studies
+from src.utils import BenchmarkIterator, load_prm_file
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# fields that differ between all suites without describing them
+_ignored_parameters = ["BenchmarkMetaData.binary", "Parameters.vtk_output"]
+
+# at least this many suites are summarized by worker processes
+_parallel_table_threshold = 16
+
+TABLE_FORMATS = ["csv", "md", "latex"]
+
+
+# <benchmark>.<metric>:<aggregation>, e.g. NG_mg.r_l2:last or NG_mg.r_l2:to_tolerance=1e-8
+@dataclass
+class SummaryColumn:
+    benchmark: str
+    metric: str
+    aggregation: str
+    argument: float | None = None
+
+    def label(self) -> str:
+        label = f"{self.benchmark}.{self.metric}:{self.aggregation}"
+        if self.argument is not None:
+            label += f"={self.argument:g}"
+
+        return label
+
+
+def _last(values: list[float], argument: float | None) -> float:
+    return values[-1]
+
+
+def _first(values: list[float], argument: float | None) -> float:
+    return values[0]
+
+
+def _mean(values: list[float], argument: float | None) -> float:
+    return sum(values) / len(values)
+
+
+def _iterations(values: list[float], argument: float | None) -> float:
+    return len(values)
+
+
+# iterations until the metric dropped to the tolerance the first time, None if it never did
+def _iterations_to_tolerance(values: list[float], argument: float | None) -> float | None:
+    for i, v in enumerate(values):
+        if v <= argument:
+            return i
+
+    return None
+
+
+_aggregations = {
+    "last": _last,
+    "first": _first,
+    "min": lambda values, argument: min(values),
+    "max": lambda values, argument: max(values),
+    "sum": lambda values, argument: sum(values),
+    "mean": _mean,
+    "iterations": _iterations,
+    "to_tolerance": _iterations_to_tolerance,
+}
+
+
+def parse_summary_column(text: str) -> SummaryColumn:
+    assert ':' in text, f"column {text} has no aggregation, expected <benchmark>.<metric>:<aggregation>"
+    name, aggregation = text.rsplit(':', 1)
+
+    assert name.count('.') == 1, f"column {text} must name exactly one benchmark and metric"
+    benchmark, metric = name.split('.')
+
+    argument = None
+    if '=' in aggregation:
+        aggregation, argument = aggregation.split('=', 1)
+        argument = float(argument)
+
+    if aggregation not in _aggregations:
+        raise ValueError(f"unknown aggregation {aggregation}, expected one of {', '.join(_aggregations.keys())}")
+
+    assert (aggregation == "to_tolerance") == (argument is not None), "only to_tolerance takes an argument"
+
+    return SummaryColumn(benchmark, metric, aggregation, argument)
+
+
+# the parameters and the aggregated metrics of a suite, None if it has no usable runs
+def _summarize_suite(task: tuple[str, list[SummaryColumn]]) \
+        -> tuple[str, dict[str, str], list[float | None]] | None:
+    target_dir, columns = task
+    prm = load_prm_file(target_dir)
+
+    try:
+        benchmarks = extract_benchmarks(target_dir, list(map(lambda c: c.metric, columns)))
+    except ValueError as e:
+        # stdout carries the table, e.g. as csv
+        print(f"skipping {target_dir}: {e}", file=sys.stderr)
+        _logger.info(f"skipping {target_dir}: {e}")
+        return None
+
+    parameters = {f"{block}.{field}": value for block, fields in prm.items() for field, value in fields.items()}
+
+    row = []
+    for c in columns:
+        candidates = list(filter(lambda b: b.decl.name == c.benchmark, benchmarks))
+        values = [] if len(candidates) == 0 else \
+            [float(v) for m in candidates[0].measurements for name, v in m.values if name == c.metric]
+
+        row.append(None if len(values) == 0 else _aggregations[c.aggregation](values, c.argument))
+
+    return target_dir, parameters, row
+
+
+# parameters whose value isn't the same in all suites
+def _varying_parameters(parameter_sets: list[dict[str, str]]) -> list[str]:
+    names = []
+
+    for parameters in parameter_sets:
+        for name in parameters:
+            if name not in names and name not in _ignored_parameters:
+                names.append(name)
+
+    return list(filter(lambda n: len(set(map(lambda p: p.get(n), parameter_sets))) > 1, names))
+
+
+# plain field names refer to the Parameters block or else the only block that has the field
+def _resolve_parameter(name: str, parameter_sets: list[dict[str, str]]) -> str:
+    if '.' in name:
+        return name
+
+    if any(map(lambda p: f"Parameters.{name}" in p, parameter_sets)):
+        return f"Parameters.{name}"
+
+    candidates = set(n for p in parameter_sets for n in p if n.split('.', 1)[1] == name)
+    assert len(candidates) <= 1, f"parameter {name} is ambiguous, use one of {', '.join(sorted(candidates))}"
+
+    return candidates.pop() if len(candidates) == 1 else f"Parameters.{name}"
+
+
+# fields are labeled without their block unless another column has the same field
+def _parameter_labels(parameters: list[str]) -> list[str]:
+    fields = list(map(lambda p: p.split('.', 1)[1], parameters))
+
+    return list(map(lambda p, f: f if fields.count(f) == 1 else p, parameters, fields))
+
+
+def _format_value(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return f"{value:.6g}"
+
+    return str(value)
+
+
+def _render_csv(header: list[str], rows: list[list[str]]) -> str:
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(header)
+    writer.writerows(rows)
+
+    return output.getvalue()
+
+
+def _render_markdown(header: list[str], rows: list[list[str]]) -> str:
+    def line(cells: list[str]) -> str:
+        return "| " + " | ".join(map(lambda c: c.replace('|', '\\|'), cells)) + " |\n"
+
+    return line(header) + line(["---"] * len(header)) + "".join(map(line, rows))
+
+
+def _escape_latex(text: str) -> str:
+    for character in ['\\', '&', '%', '$', '#', '_', '{', '}']:
+        replacement = "\\textbackslash{}" if character == '\\' else '\\' + character
+        text = text.replace(character, replacement)
+
+    return text
+
+
+def _render_latex(header: list[str], rows: list[list[str]]) -> str:
+    def line(cells: list[str]) -> str:
+        return " & ".join(map(_escape_latex, cells)) + " \\\\\n"
+
+    text = "\\begin{tabular}{" + "l" * len(header) + "}\n\\hline\n"
+    text += line(header) + "\\hline\n"
+    text += "".join(map(line, rows))
+    text += "\\hline\n\\end{tabular}\n"
+
+    return text
+
+
+_renderers = {
+    "csv": _render_csv,
+    "md": _render_markdown,
+    "latex": _render_latex,
+}
+
+
+# the summaries of the suites that have usable runs
+def _summarize_suites(target_dirs: list[str], columns: list[SummaryColumn], jobs: int | None) \
+        -> list[tuple[str, dict[str, str], list[float | None]]]:
+    tasks = list(map(lambda b: (b, columns), target_dirs))
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    # extracting the run logs is cpu bound, but starting worker processes only pays off for large trees
+    if jobs > 1 and len(tasks) >= _parallel_table_threshold:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(jobs) as executor:
+            summaries = list(executor.map(_summarize_suite, tasks, chunksize=4))
+    else:
+        summaries = list(map(_summarize_suite, tasks))
+
+    return list(filter(lambda s: s is not None, summaries))
+
+
+# one row per suite with the varying (or the given) parameters and the aggregated metrics,
+# sorted by any of the columns, rows without a value in the sort column come last
+def create_table(target_dirs: list[str], columns: list[SummaryColumn], parameters: list[str] | None, format: str,
+                 sort: str | None = None, descending: bool = False, jobs: int | None = None) -> str:
+    assert format in TABLE_FORMATS, f"table format must be one of {', '.join(TABLE_FORMATS)}"
+
+    summaries = _summarize_suites(list(BenchmarkIterator(target_dirs)), columns, jobs)
+    assert len(summaries) > 0, "no suite has runs to summarize"
+
+    parameter_sets = list(map(lambda s: s[1], summaries))
+    if parameters is None:
+        parameters = _varying_parameters(parameter_sets)
+    else:
+        parameters = list(map(lambda p: _resolve_parameter(p, parameter_sets), parameters))
+
+    root = os.path.commonpath(list(map(lambda s: s[0], summaries)))
+    if len(summaries) == 1:
+        root = os.path.dirname(root)
+
+    header = ["suite"] + _parameter_labels(parameters) + list(map(lambda c: c.label(), columns))
+    rows = list(map(lambda s: [os.path.relpath(s[0], root)] + list(map(lambda p: s[1].get(p), parameters)) + s[2],
+                    summaries))
+
+    if sort is not None:
+        assert sort in header, f"can't sort by {sort}, the columns are {', '.join(header)}"
+        i = header.index(sort)
+
+        def sort_key(row: list) -> tuple:
+            value = row[i]
+            if value is None:
+                return 2, 0
+
+            try:
+                return 0, float(value)
+            except ValueError:
+                return 1, value
+
+        present = sorted(filter(lambda r: r[i] is not None, rows), key=sort_key, reverse=descending)
+        rows = present + list(filter(lambda r: r[i] is None, rows))
+
+    return _renderers[format](header, list(map(lambda r: list(map(_format_value, r)), rows)))
+
+
+# one row per suite of every scaling study below the target dirs, ordered by study and tasks,
+# with the speedup and the parallel efficiency computed from the first column, e.g. NG_mg.time:sum
+def create_scaling_table(target_dirs: list[str], columns: list[SummaryColumn], format: str,
+                         jobs: int | None = None) -> str:
+    assert format in TABLE_FORMATS, f"table format must be one of {', '.join(TABLE_FORMATS)}"
+
+    studies = find_scaling_studies(target_dirs)
+    assert len(studies) > 0, "no suite belongs to a scaling study"
+
+    points = [p for study in sorted(studies.keys()) for p in studies[study]]
+    summaries = {s[0]: s for s in _summarize_suites(list(map(lambda p: p.target_dir, points)), columns, jobs)}
+
+    header = ["study", "mode", "tasks", "totalTets"] + list(map(lambda c: c.label(), columns)) + \
+             ["speedup", "efficiency"]
+    rows = []
+
+    for study in sorted(studies.keys()):
+        study_points = studies[study]
+        values = list(map(lambda p: summaries[p.target_dir][2] if p.target_dir in summaries else [None] * len(columns),
+                          study_points))
+        speedups = compute_speedups(study_points, list(map(lambda v: v[0], values)))
+
+        for p, v, (speedup, efficiency) in zip(study_points, values, speedups):
+            rows.append([p.study, p.mode, p.tasks, p.total_tets] + v + [speedup, efficiency])
+
+    return _renderers[format](header, list(map(lambda r: list(map(_format_value, r)), rows)))
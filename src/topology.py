@@ -0,0 +1,56 @@
+import os
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+_cpu_path = "/sys/devices/system/cpu"
+
+
+# parses the list format of the kernel, e.g. 0-3,8
+def parse_cpu_list(text: str) -> list[int]:
+    cpus = []
+
+    for part in text.strip().split(','):
+        if part == '':
+            continue
+
+        if '-' in part:
+            first, last = part.split('-')
+            cpus += list(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+
+    return cpus
+
+
+def format_cpu_list(cpus: list[int]) -> str:
+    return ",".join(map(str, cpus))
+
+
+# the logical cpus of every core separated by colons, e.g. 0,8:1,9 for two cores with their SMT siblings
+def format_core_list(cores: list[list[int]]) -> str:
+    return ":".join(map(format_cpu_list, cores))
+
+
+# the logical cpus of each physical core this process may run on, sorted by socket and core
+# empty if the topology can't be read
+def read_physical_cores() -> list[list[int]]:
+    available_cpus = os.sched_getaffinity(0)
+    cores: dict[tuple[int, int], list[int]] = {}
+
+    for cpu in sorted(available_cpus):
+        topology_path = os.path.join(_cpu_path, f"cpu{cpu}", "topology")
+
+        try:
+            with open(os.path.join(topology_path, "physical_package_id")) as f:
+                package_id = int(f.read())
+            with open(os.path.join(topology_path, "core_id")) as f:
+                core_id = int(f.read())
+        except (OSError, ValueError):
+            _logger.info(f"couldn't read the topology of cpu {cpu}, jobs aren't pinned")
+            return []
+
+        cores.setdefault((package_id, core_id), []).append(cpu)
+
+    return [cores[k] for k in sorted(cores.keys())]
@@ -1,23 +1,19 @@
+import atexit
+import copy
+import json
 import os
 import re
-from dataclasses import dataclass
+import time
+from collections.abc import Iterator
 from functools import reduce
 
-import logging
 
-_logger = logging.getLogger(__name__)
+# importing logging and dataclasses takes a large part of the startup time of the cli,
+# so the helpers that every command needs only import logging when they log something
+def _get_logger():
+    import logging
 
-
-@dataclass
-class Point2D:
-    x: float
-    y: float
-
-
-@dataclass
-class Graph:
-    label: str
-    points: list[Point2D]
+    return logging.getLogger(__name__)
 
 
 def list_flatten(l):
@@ -37,18 +33,216 @@ def convert_to_valid_filename(string: str) -> str:
     return filename
 
 
+# appended to a run log by the job scripts once the binary exited successfully
+RUN_COMPLETE_MARKER = "#run-complete"
+
+
 def build_run_log_filename(i: int) -> str:
     return f"run{i}.log"
 
 
-def find_prm_files(target_dir: str) -> list[str]:
-    parameter_files = []
+def is_run_log_complete(run_log_path: str) -> bool:
+    if not os.path.isfile(run_log_path):
+        return False
+
+    with open(run_log_path, 'r') as f:
+        run_log = f.read()
+
+    if RUN_COMPLETE_MARKER in run_log:
+        return True
+
+    from src.status import build_run_stderr_filename
+
+    # the job scripts create the stderr file when a run starts, so a log without the marker next to it belongs to a run
+    # that failed or was interrupted. logs without it were written before the marker existed and are kept,
+    # their runs may have converged before maxNGIterations
+    stderr_path = os.path.join(os.path.dirname(run_log_path), build_run_stderr_filename(_run_log_index(run_log_path)))
+
+    return not os.path.isfile(stderr_path)
+
+
+def _run_log_index(run_log_path: str) -> int:
+    match = re.fullmatch(r'run(\d+)\.log', os.path.basename(run_log_path))
+    assert match is not None, f"{run_log_path} isn't a run log"
+
+    return int(match.group(1))
+
+
+class RepeatSpec:
+    min: int
+    max: int
+    # relative half width of the confidence interval that ends adaptive repetitions, None for fixed repetitions
+    rel_ci: float | None
+    metric: str
+    benchmark: str | None
+
+    def __init__(self, min: int, max: int, rel_ci: float | None = None, metric: str = "time",
+                 benchmark: str | None = None):
+        self.min = min
+        self.max = max
+        self.rel_ci = rel_ci
+        self.metric = metric
+        self.benchmark = benchmark
+
+    def is_adaptive(self) -> bool:
+        return self.rel_ci is not None
+
 
-    for f in os.scandir(target_dir):
-        if f.is_file() and os.path.splitext(f.name)[1] == ".prm":
-            parameter_files.append(f.path)
+# repeat is either a plain amount or e.g. "adaptive min=3 max=15 rel_ci=2% metric=time benchmark=NG_mg"
+def parse_repeat_spec(value: str) -> RepeatSpec:
+    words = value.split()
+
+    if len(words) == 1:
+        return RepeatSpec(int(words[0]), int(words[0]))
+
+    if words[0] != "adaptive":
+        raise ValueError(f"invalid repeat value {value}")
+
+    options = {}
+    for word in words[1:]:
+        if word.count('=') != 1:
+            raise ValueError(f"invalid adaptive repeat option {word}, expected <key>=<value>")
+
+        key, option_value = word.split('=')
+        options[key] = option_value
+
+    unknown_options = set(options.keys()) - {"min", "max", "rel_ci", "metric", "benchmark"}
+    if len(unknown_options) > 0:
+        raise ValueError(f"unknown adaptive repeat options {unknown_options}")
+
+    rel_ci = options.get("rel_ci", "5%")
+    if rel_ci.endswith('%'):
+        rel_ci = float(rel_ci[:-1]) / 100
+    else:
+        rel_ci = float(rel_ci)
+
+    spec = RepeatSpec(int(options.get("min", 3)), int(options.get("max", 15)), rel_ci, options.get("metric", "time"),
+                      options.get("benchmark"))
+
+    if spec.min < 2 or spec.max < spec.min:
+        raise ValueError(f"adaptive repeat needs 2 <= min <= max, got {value}")
+
+    return spec
+
+
+# amount of repetitions that were run, adaptive suites end with the first missing run log
+def count_repetitions(target_dir: str, spec: RepeatSpec) -> int:
+    if not spec.is_adaptive():
+        return spec.max
+
+    amount = 0
+    while amount < spec.max and os.path.isfile(os.path.join(target_dir, build_run_log_filename(amount))):
+        amount += 1
+
+    return amount
+
+
+# caches the directory listings and parsed parameter files of the benchmark tree across invocations
+# entries are keyed by the modification time, so changed directories and parameter files are read again
+class SuiteIndex:
+    _path: str
+    _directories: dict[str, dict]
+    _parameters: dict[str, dict]
+    _dirty: bool
+
+    def __init__(self, path: str):
+        self._path = path
+        self._directories = {}
+        self._parameters = {}
+        self._dirty = False
+
+        try:
+            with open(path, 'r') as f:
+                index = json.load(f)
 
-    return parameter_files
+            if index.get("version") == _suite_index_version:
+                self._directories = index["directories"]
+                self._parameters = index["parameters"]
+        except (OSError, ValueError, KeyError):
+            # a missing or broken index is simply rebuilt
+            pass
+
+    def prm_files(self, directory: str) -> list[str]:
+        return list(map(lambda name: os.path.join(directory, name), self._scan(directory)["prm_files"]))
+
+    def subdirectories(self, directory: str) -> list[str]:
+        return list(map(lambda name: os.path.join(directory, name), self._scan(directory)["subdirectories"]))
+
+    def load_parameters(self, prm_path: str) -> dict[str, dict[str, str]]:
+        key = os.path.abspath(prm_path)
+        mtime = os.stat(prm_path).st_mtime_ns
+
+        entry = self._parameters.get(key)
+        if entry is None or entry["mtime"] != mtime:
+            with open(prm_path, 'r') as f:
+                entry = {"mtime": mtime, "parameters": parse_prm_file(f.read())}
+
+            self._store(self._parameters, key, entry)
+
+        # callers may modify their parameters
+        return copy.deepcopy(entry["parameters"])
+
+    def save(self) -> None:
+        if not self._dirty or not os.path.isdir(os.path.dirname(self._path)):
+            return
+
+        index = {"version": _suite_index_version, "directories": self._directories, "parameters": self._parameters}
+
+        try:
+            write_file_atomically(self._path, json.dumps(index))
+            self._dirty = False
+        except OSError as e:
+            _get_logger().info(f"couldn't save the suite index {self._path}: {e}")
+
+    def _scan(self, directory: str) -> dict:
+        key = os.path.abspath(directory)
+        mtime = os.stat(directory).st_mtime_ns
+
+        entry = self._directories.get(key)
+        if entry is not None and entry["mtime"] == mtime:
+            return entry
+
+        prm_files = []
+        subdirectories = []
+        for f in os.scandir(directory):
+            if f.is_file() and os.path.splitext(f.name)[1] == ".prm":
+                prm_files.append(f.name)
+            elif f.is_dir():
+                subdirectories.append(f.name)
+
+        entry = {"mtime": mtime, "prm_files": sorted(prm_files), "subdirectories": sorted(subdirectories)}
+        self._store(self._directories, key, entry)
+
+        return entry
+
+    def _store(self, entries: dict[str, dict], key: str, entry: dict) -> None:
+        # files changed within the timestamp granularity could change again unnoticed, so they aren't cached
+        if time.time_ns() - entry["mtime"] < _racy_mtime_window:
+            entries.pop(key, None)
+        else:
+            entries[key] = entry
+
+        self._dirty = True
+
+
+_suite_index_version = 1
+_racy_mtime_window = 2 * 10 ** 9
+
+_suite_index: SuiteIndex | None = None
+
+
+def get_suite_index() -> SuiteIndex:
+    global _suite_index
+
+    if _suite_index is None:
+        _suite_index = SuiteIndex(os.path.join("benchmarks", ".index.json"))
+        atexit.register(_suite_index.save)
+
+    return _suite_index
+
+
+def find_prm_files(target_dir: str) -> list[str]:
+    return get_suite_index().prm_files(target_dir)
 
 
 def find_single_prm_file(target_dir: str) -> str:
@@ -79,14 +273,28 @@ def parse_prm_file(param_file_content: str) -> dict[str, dict[str, str]]:
     return prm
 
 
+# readers see either the old or the new content, never a partially written file
+def write_file_atomically(path: str, text: str) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
 def load_prm_file(dir: str) -> dict[str, dict[str, str]]:
     prm_path = find_single_prm_file(dir)
-    with open(prm_path, 'r') as f:
-        prm_content = f.read()
-
-    prm = parse_prm_file(prm_content)
 
-    return prm
+    return get_suite_index().load_parameters(prm_path)
 
 
 def load_benchmark_parameters(dir: str) -> dict[str, dict[str, str]]:
@@ -221,16 +429,21 @@ def clean_directory(directory: str, file_ext: str | None = None) -> None:
             if os.path.isfile(file_path):
                 os.unlink(file_path)
             else:
-                _logger.warning(
+                _get_logger().warning(
                     f'Cleaning directory encountered unexpected file format of {filename} in directory {directory}')
         except Exception as e:
-            _logger.error(f'Failed to delete {file_path}. Reason: {e}')
+            _get_logger().error(f'Failed to delete {file_path}. Reason: {e}')
 
 
 def clean_benchmark_suite(path: str) -> None:
     clean_directory(os.path.join(path, 'matplots'))
     clean_directory(os.path.join(path, 'vtk'))
     clean_directory(path, '.log')
+    clean_directory(path, '.usage.json')
+    clean_directory(path, '.perfctr.csv')
+    clean_directory(path, '.failures.jsonl')
+    clean_directory(path, '.status')
+    clean_directory(path, '.stderr')
 
 
 def benchmark_fold_iterator(directory_path: str, leaf_action, node_action):
@@ -241,37 +454,65 @@ def benchmark_fold_iterator(directory_path: str, leaf_action, node_action):
     else:
         node_action(directory_path)
 
-        files = list(os.scandir(directory_path))
-        directories = filter(lambda f: f.is_dir(), files)
-        for d in directories:
-            benchmark_fold_iterator(d.path, leaf_action, node_action)
+        for d in get_suite_index().subdirectories(directory_path):
+            benchmark_fold_iterator(d, leaf_action, node_action)
 
 
+# yields the benchmark suites below the given directories as soon as they are found
+# wide trees on network file systems profit from listing several directories concurrently,
+# the amount of threads defaults to BA_DISCOVERY_THREADS
 class BenchmarkIterator:
     directory_path: list[str]
-    benchmark_paths: list[str]
-    counter: int
+    discovery_threads: int
 
-    def __init__(self, directory_path: str | list[str]):
+    def __init__(self, directory_path: str | list[str], discovery_threads: int | None = None):
         if isinstance(directory_path, str):
             self.directory_path = [directory_path]
         else:
             self.directory_path = directory_path
 
-        self.benchmark_paths = []
-        self.counter = 0
+        if discovery_threads is None:
+            discovery_threads = int(os.environ.get("BA_DISCOVERY_THREADS", 1))
+
+        assert discovery_threads > 0
+        self.discovery_threads = discovery_threads
+
+    def __iter__(self) -> Iterator[str]:
+        if self.discovery_threads == 1:
+            for dir in self.directory_path:
+                yield from _discover_suites(dir)
+        else:
+            yield from self._discover_suites_concurrently()
+
+    def _discover_suites_concurrently(self) -> Iterator[str]:
+        # importing concurrent.futures is slow, most commands discover sequentially
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+        index = get_suite_index()
+
+        with ThreadPoolExecutor(self.discovery_threads) as executor:
+            # maps the pending directory listings to their directories
+            listings = {executor.submit(index.prm_files, d): d for d in self.directory_path}
+
+            while len(listings) > 0:
+                done, _ = wait(listings.keys(), return_when=FIRST_COMPLETED)
+
+                for f in done:
+                    directory = listings.pop(f)
 
-    def __iter__(self):
-        for dir in self.directory_path:
-            benchmark_fold_iterator(dir, lambda d: self.benchmark_paths.append(d), lambda d: None)
+                    if len(f.result()) > 0:
+                        yield directory
+                        continue
 
-        return self
+                    # the listing is cached, so this doesn't scan the directory again
+                    for d in index.subdirectories(directory):
+                        listings[executor.submit(index.prm_files, d)] = d
 
-    def __next__(self):
-        if self.counter >= len(self.benchmark_paths):
-            raise StopIteration
 
-        el = self.benchmark_paths[self.counter]
-        self.counter += 1
+def _discover_suites(directory_path: str) -> Iterator[str]:
+    if len(find_prm_files(directory_path)) > 0:
+        yield directory_path
+        return
 
-        return el
+    for d in get_suite_index().subdirectories(directory_path):
+        yield from _discover_suites(d)
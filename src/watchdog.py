@@ -0,0 +1,194 @@
+import argparse
+import datetime
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+
+from src.history import predict_run_duration
+from src.status import RunStatus, STALLED_EXIT_CODE, build_run_status_filename, write_run_status
+from src.utils import build_run_log_filename
+
+# runs a benchmark command and kills it when its run log stops showing progress, i.e. new measurement lines
+# usage: python3 -m src.watchdog --log runN.log [options] -- command...
+
+_repository_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+_progress_pattern = b"@["
+
+# seconds between the termination request and killing a stalled command
+_termination_grace_period = 10
+
+
+@dataclass
+class StallPolicy:
+    # seconds without a new measurement line after which a run counts as stalled
+    timeout: float | None = None
+    # a run is killed when it takes this many times longer than the slowest recorded equivalent run
+    factor: float | None = None
+    retries: int = 0
+
+    def is_enabled(self) -> bool:
+        return self.timeout is not None or self.factor is not None
+
+
+def build_run_failures_filename(i: int) -> str:
+    return f"run{i}.failures.jsonl"
+
+
+# the arguments that wrap the command of a run into the watchdog
+def build_watchdog_arguments(policy: StallPolicy, target_dir: str, i: int,
+                             params: dict[str, dict[str, str]]) -> list[str]:
+    target_dir = os.path.abspath(target_dir)
+
+    arguments = ["-m", "src.watchdog", "--log", os.path.join(target_dir, build_run_log_filename(i)),
+                 "--failures", os.path.join(target_dir, build_run_failures_filename(i)),
+                 "--status", os.path.join(target_dir, build_run_status_filename(i)),
+                 "--retries", str(policy.retries)]
+
+    if policy.timeout is not None:
+        arguments += ["--stall-timeout", str(policy.timeout)]
+
+    if policy.factor is not None:
+        predicted_duration = predict_run_duration(params)
+        if predicted_duration is not None:
+            arguments += ["--max-runtime", str(policy.factor * predicted_duration)]
+
+    return arguments + ["--"]
+
+
+# watchdogs launched by job scripts need the repository on the python path
+def build_watchdog_command(policy: StallPolicy, target_dir: str, i: int, params: dict[str, dict[str, str]]) -> str:
+    arguments = build_watchdog_arguments(policy, target_dir, i, params)
+
+    return f'PYTHONPATH="{_repository_path}" python3 ' + " ".join(map(lambda a: f'"{a}"', arguments))
+
+
+def get_watchdog_environment() -> dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = _repository_path + os.pathsep + env.get("PYTHONPATH", '')
+
+    return env
+
+
+class ProgressMonitor:
+    _path: str
+    _offset: int
+    _tail: bytes
+    last_progress: float
+
+    def __init__(self, path: str):
+        self._path = path
+        self._offset = 0
+        self._tail = b''
+        self.last_progress = time.monotonic()
+
+    def update(self) -> None:
+        if not os.path.isfile(self._path):
+            return
+
+        with open(self._path, 'rb') as f:
+            f.seek(self._offset)
+            new_output = f.read()
+
+        self._offset += len(new_output)
+
+        # the previous byte is kept, so a progress marker split between two reads is still found
+        if _progress_pattern in self._tail + new_output:
+            self.last_progress = time.monotonic()
+
+        if len(new_output) > 0:
+            self._tail = new_output[-1:]
+
+
+def _record_failure(failures_path: str, attempt: int, reason: str) -> None:
+    with open(failures_path, 'a') as f:
+        f.write(json.dumps({"time": datetime.datetime.now().isoformat(), "attempt": attempt, "reason": reason}) + '\n')
+
+
+def _terminate(process: subprocess.Popen) -> None:
+    if process.poll() is not None:
+        return
+
+    os.killpg(process.pid, signal.SIGTERM)
+
+    try:
+        process.wait(_termination_grace_period)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+# returns the reason why the command was killed, None if it exited on its own
+def _watch(process: subprocess.Popen, run_log_path: str, stall_timeout: float | None,
+           max_runtime: float | None) -> str | None:
+    start_time = time.monotonic()
+    monitor = ProgressMonitor(run_log_path)
+
+    limits = list(filter(lambda l: l is not None, [stall_timeout, max_runtime]))
+    poll_interval = min([5.0] + list(map(lambda l: l / 10, limits)))
+
+    while process.poll() is None:
+        time.sleep(poll_interval)
+        monitor.update()
+
+        now = time.monotonic()
+        if stall_timeout is not None and now - monitor.last_progress > stall_timeout:
+            _terminate(process)
+            return f"no progress for {stall_timeout} seconds"
+
+        if max_runtime is not None and now - start_time > max_runtime:
+            _terminate(process)
+            return f"exceeded the predicted runtime limit of {max_runtime:.0f} seconds"
+
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog='watchdog')
+    parser.add_argument('--log', required=True)
+    parser.add_argument('--failures', required=True)
+    parser.add_argument('--status', required=True)
+    parser.add_argument('--stall-timeout', type=float)
+    parser.add_argument('--max-runtime', type=float)
+    parser.add_argument('--retries', type=int, default=0)
+    parser.add_argument('command', nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    command = args.command
+    if len(command) > 0 and command[0] == '--':
+        command = command[1:]
+
+    assert len(command) > 0, "no command to watch"
+
+    process = None
+
+    # cancelled jobs take the watched command with them, it runs in its own process group
+    def forward_termination(signum, frame):
+        if process is not None:
+            _terminate(process)
+        sys.exit(128 + signum)
+
+    signal.signal(signal.SIGTERM, forward_termination)
+
+    for attempt in range(args.retries + 1):
+        process = subprocess.Popen(command, process_group=0)
+        reason = _watch(process, args.log, args.stall_timeout, args.max_runtime)
+
+        if reason is None:
+            # shells report runs killed by a signal as 128 + signal
+            return process.returncode if process.returncode >= 0 else 128 - process.returncode
+
+        _record_failure(args.failures, attempt, reason)
+        print(f"watchdog: killed attempt {attempt} of {args.log}, {reason}", file=sys.stderr)
+
+    write_run_status(args.status, RunStatus(STALLED_EXIT_CODE, None, reason + '\n'))
+
+    return STALLED_EXIT_CODE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
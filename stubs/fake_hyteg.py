@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import os
+import random
+import signal
+import sys
+import time
+
+# stand-in for nlDiffusionExample that reads a .prm file and prints the benchmark log of a newton-galerkin solve
+# with multigrid inner solves, it plugs in through BenchmarkMetaData.binary and is never built.
+# the optional FakeHyteg block of the .prm file configures it:
+# FakeHyteg
+# {
+#     iterationDelay 0.01;   seconds every inner iteration takes
+#     failProbability 0.1;   chance that the run exits with failExitCode at a random iteration
+#     failExitCode 1;
+#     hangProbability 0.1;   chance that the run stops printing at a random iteration until it is killed
+#     memory 100;            megabytes every rank allocates
+#     seed 0;                makes the injected failures and the residuals reproducible
+# }
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils import parse_prm_file
+
+_start = time.monotonic()
+
+
+def _rank() -> int:
+    for variable in ["OMPI_COMM_WORLD_RANK", "PMI_RANK", "SLURM_PROCID"]:
+        if variable in os.environ:
+            return int(os.environ[variable])
+
+    return 0
+
+
+def _log(text: str) -> None:
+    print(f"[0][INFO    ]------({time.monotonic() - _start:.3f} sec) {text}", flush=True)
+
+
+def main() -> int:
+    if len(sys.argv) != 2:
+        print("usage: fake_hyteg.py <parameter file>", file=sys.stderr)
+        return 2
+
+    with open(sys.argv[1], 'r') as f:
+        prm = parse_prm_file(f.read())
+
+    parameters = prm.get("Parameters", {})
+    fake = prm.get("FakeHyteg", {})
+
+    outer_iterations = int(parameters.get("maxNGIterations", 20))
+    max_inner_iterations = int(parameters.get("mgMaxIter", 200))
+    tolerance = float(parameters.get("mgToleranceValue", 1e-14))
+    chebyshev_order = int(parameters.get("chebyshevOrder", 2))
+
+    iteration_delay = float(fake.get("iterationDelay", 0))
+    fail_probability = float(fake.get("failProbability", 0))
+    fail_exit_code = int(fake.get("failExitCode", 1))
+    hang_probability = float(fake.get("hangProbability", 0))
+    memory = int(fake.get("memory", 0))
+
+    rng = random.Random(int(fake["seed"]) if "seed" in fake else None)
+
+    # touching every page makes the allocation count towards the resident set size
+    allocation = bytearray(memory * 1024 * 1024)
+    for i in range(0, len(allocation), 4096):
+        allocation[i] = 1
+
+    # the outer iteration at which a failure or hang is injected, all ranks agree on it if a seed is given
+    fail_at = rng.randrange(outer_iterations) if rng.random() < fail_probability else None
+    hang_at = rng.randrange(outer_iterations) if rng.random() < hang_probability else None
+
+    # like the real app, only rank 0 writes the log
+    verbose = _rank() == 0
+
+    if verbose:
+        _log("#benchmark[NG_mg]: r_l2, time, acc_iterations<int>")
+        for o in range(outer_iterations):
+            _log(f"#benchmark[NG_inner_mg_{o}]: r_l2, time")
+
+    # higher chebyshev orders smooth better and converge faster
+    contraction = 0.5 ** (chebyshev_order + 1)
+    r_outer = 1.0
+    accumulated_iterations = 0
+
+    for o in range(outer_iterations):
+        if o == fail_at:
+            print(f"fake failure injected in outer iteration {o}", file=sys.stderr, flush=True)
+            return fail_exit_code
+
+        if o == hang_at:
+            print(f"fake hang injected in outer iteration {o}", file=sys.stderr, flush=True)
+            while True:
+                signal.pause()
+
+        outer_start = time.monotonic()
+        r_inner = r_outer
+
+        for i in range(max_inner_iterations):
+            inner_start = time.monotonic()
+            time.sleep(iteration_delay)
+
+            r_inner *= contraction * rng.uniform(0.5, 1.5)
+            accumulated_iterations += 1
+
+            if verbose:
+                _log(f"@[NG_inner_mg_{o}]:{i} r_l2 = {r_inner:.6e}, time = {time.monotonic() - inner_start:.6e}")
+
+            if r_inner < tolerance:
+                break
+
+        r_outer *= rng.uniform(0.1, 0.5)
+
+        if verbose:
+            _log(f"@[NG_mg]:{o} r_l2 = {r_outer:.6e}, time = {time.monotonic() - outer_start:.6e}, "
+                 f"acc_iterations = {accumulated_iterations}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())